@@ -1,448 +1,156 @@
 
 import streamlit as st
-import json
-import re
-from collections import defaultdict, Counter
-from docx import Document
-import zipfile
-import io
+import os
+import hashlib
 from typing import List, Dict, Tuple, Optional
+from pipeline import extract_document, process_documents_parallel
+from output_utils import NEAR_DUPLICATES_FILENAME, generate_outputs, create_download_zip
+from dedup_utils import NearDuplicateFilter
+from cache_utils import DocumentCache, content_hash
+from metrics_utils import METRICS_FORMATS, StageMetrics
+from document_utils import as_document, parse_document
+from extract_fewshots import combine_few_shot_outputs, extract_few_shot_examples_and_jsonl
+from progress_utils import ProgressBus
 
 def extract_text_from_docx(uploaded_file) -> str:
     """Extract text from uploaded .docx file"""
     try:
-        doc = Document(uploaded_file)
-        full_text = []
-        
-        # Extract from paragraphs
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                full_text.append(paragraph.text.strip())
-        
-        # Also extract from tables if any
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if cell.text.strip():
-                        full_text.append(cell.text.strip())
-        
-        return '\n'.join(full_text)
+        # Paragraphs, and also tables if any
+        return as_document(uploaded_file).text_with_tables
     except Exception as e:
         st.error(f"Error reading document: {str(e)}")
         return ""
 
-def process_document(uploaded_file):
+@st.cache_resource
+def get_document_cache() -> DocumentCache:
+    """Open the on-disk extraction cache once per server process"""
+    return DocumentCache()
+
+def streamlit_progress_sink(text: str, min_total: int = 0):
+    """ProgressBus sink updating a single st.progress bar, created on the first event it shows"""
+    bar = None
+
+    def sink(event):
+        nonlocal bar
+        if event.total <= min_total:
+            return
+        label = text.format(done=event.done, total=event.total)
+        if bar is None:
+            bar = st.progress(event.fraction, text=label)
+        else:
+            bar.progress(event.fraction, text=label)
+
+    return sink
+
+def get_parsed_document(uploaded_file, file_hash: str):
+    """ParsedDocument of an upload, parsed at most once per session and shared by every extractor"""
+    parsed_documents = st.session_state['parsed_documents']
+    if file_hash not in parsed_documents:
+        parsed_documents[file_hash] = parse_document(uploaded_file.getvalue(), uploaded_file.name)
+    return parsed_documents[file_hash]
+
+def process_document(uploaded_file, cache: Optional[DocumentCache] = None, collect_metrics: bool = False):
     """Updated process_document function with improved transition extraction"""
     try:
-        # Read the document
-        doc = Document(uploaded_file)
-        filename = uploaded_file.name
-        
-        # Extract text
-        full_text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
-        
-        # Find ALL markers in the document (for multiple articles)
-        marker = "À savoir également dans votre département"
-        all_triplets = []
-        all_transitions = []
-        
-        # Split text into potential articles
-        marker_positions = []
-        start_pos = 0
-        while True:
-            pos = full_text.find(marker, start_pos)
-            if pos == -1:
-                break
-            marker_positions.append(pos)
-            start_pos = pos + 1
-        
-        debug_info = {
-            'text_length': len(full_text),
-            'has_marker': len(marker_positions) > 0,
-            'marker_count': len(marker_positions),
-            'found_transitions': [],
-            'articles_processed': 0,
-            'transition_lines_found': 0
-        }
-        
-        if not marker_positions:
-            return [], [], filename, debug_info
-        
-        # Process each article section
-        for i, marker_pos in enumerate(marker_positions):
-            # Find the main paragraph after this marker
-            main_paragraph_start = marker_pos + len(marker)
-            
-            # Find the transitions marker for this article
-            transitions_marker_index = full_text.find("Transitions :", main_paragraph_start)
-            if transitions_marker_index == -1:
-                continue
-            
-            # Find the end of this article (next marker or end of transitions section)
-            next_marker_pos = marker_positions[i + 1] if i + 1 < len(marker_positions) else len(full_text)
-            
-            # Make sure transitions marker is before next article
-            if transitions_marker_index > next_marker_pos:
-                continue
-            
-            # Extract the main paragraph (between marker and "Transitions:")
-            main_paragraph = full_text[main_paragraph_start:transitions_marker_index].strip()
-            
-            # Extract transitions section
-            transitions_start = transitions_marker_index + len("Transitions :")
-            transitions_end = next_marker_pos
-            
-            # Look for article number pattern to end transitions section
-            transitions_section = full_text[transitions_start:transitions_end]
-            next_article_match = re.search(r'\n\s*\d+\s+du\s+\d+/\d+', transitions_section)
-            if next_article_match:
-                transitions_section = transitions_section[:next_article_match.start()].strip()
-            
-            # Extract individual transitions using the improved function
-            article_transitions = extract_transitions_from_section(transitions_section)
-            debug_info['found_transitions'].extend(article_transitions)
-            
-            # Process each transition ONLY within this article's main paragraph
-            for transition in article_transitions:
-                # Create variations of the transition
-                transition_variations = create_transition_variations(transition)
-                
-                # Extract triplets for this transition ONLY from this article's main paragraph
-                triplets = extract_context_around_transition(main_paragraph, transition, transition_variations)
-                all_triplets.extend(triplets)
-                
-                # Update progress for user feedback
-                if len(article_transitions) > 10:  # Only show progress for large batches
-                    progress = (article_transitions.index(transition) + 1) / len(article_transitions)
-                    st.progress(progress, text=f"Processing transition {article_transitions.index(transition) + 1}/{len(article_transitions)}")
-            
-            all_transitions.extend(article_transitions)
-            debug_info['articles_processed'] += 1
-        
-        debug_info['transition_lines_found'] = len(all_transitions)
-        return all_triplets, all_transitions, filename, debug_info
-        
+        data = uploaded_file.getvalue()
+        if cache is not None:
+            cached = cache.get(data)
+            if cached is not None:
+                triplets, transitions, debug_info = cached
+                return triplets, transitions, uploaded_file.name, debug_info
+        
+        triplets, transitions, filename, debug_info = extract_document(
+            get_parsed_document(uploaded_file, content_hash(data)),
+            uploaded_file.name,
+            # Only show progress for large batches of transitions
+            progress=ProgressBus([streamlit_progress_sink("Processing transition {done}/{total}", min_total=10)]),
+            metrics=StageMetrics() if collect_metrics else None
+        )
+        if cache is not None:
+            cache.put(data, triplets, transitions, {k: v for k, v in debug_info.items() if k != 'metrics'})
+        return triplets, transitions, filename, debug_info
     except Exception as e:
         st.error(f"Error processing {uploaded_file.name}: {str(e)}")
         return [], [], uploaded_file.name, {'error': str(e)}
 
 
-def extract_transitions_from_section(transitions_section: str) -> List[str]:
-    """Extract clean transitions from the transitions section at the end of articles"""
-    transitions = []
-    
-    for line in transitions_section.split('\n'):
-        line = line.strip()
-        if line and line != "Transitions :" and not re.match(r'^\d+\s+du\s+\d+/\d+', line):
-            # Clean up common prefixes/suffixes
-            line = re.sub(r'^[-•\d\.\s\:]+', '', line).strip()
-            # Remove trailing punctuation and spaces
-            line = re.sub(r'[,\s]+$', '', line).strip()
-            if len(line) > 2:
-                transitions.append(line)
-    
-    return transitions
-
-def create_transition_variations(transition: str) -> List[str]:
-    """Create variations of a transition to handle different formats and punctuation"""
-    variations = []
-    
-    # Original transition
-    variations.append(transition)
-    
-    # Basic case variations
-    variations.append(transition.lower())
-    variations.append(transition.capitalize())
-    
-    # Handle "que" vs "qu'" - FIXED VERSION
-    if "que" in transition.lower():
-        # Replace "que" at word boundary with "qu'"
-        var_with_apostrophe = re.sub(r'\bque\b', "qu'", transition, flags=re.IGNORECASE)
-        if var_with_apostrophe != transition:  # Only add if it's different
-            variations.append(var_with_apostrophe)
-            variations.append(var_with_apostrophe.lower())
-            variations.append(var_with_apostrophe.capitalize())
-    
-    # Handle "qu'" vs "que" (reverse case)
-    if "qu'" in transition.lower():
-        var_without_apostrophe = re.sub(r"\bqu'", "que ", transition, flags=re.IGNORECASE)
-        if var_without_apostrophe != transition:
-            variations.append(var_without_apostrophe)
-            variations.append(var_without_apostrophe.lower())
-    
-    # Handle punctuation variations
-    base_transition = transition.rstrip('.,!?;:')
-    if base_transition != transition:
-        variations.append(base_transition)
-        variations.append(base_transition.lower())
-    
-    # Add version with comma at the end
-    if not transition.endswith(','):
-        variations.append(transition + ',')
-        variations.append((transition + ',').lower())
-    
-    # Add version with period at the end
-    if not transition.endswith('.'):
-        variations.append(transition + '.')
-        variations.append((transition + '.').lower())
-    
-    # Remove duplicates while preserving order
-    unique_variations = []
-    for var in variations:
-        if var and var not in unique_variations:
-            unique_variations.append(var)
-    
-    return unique_variations
-
+def results_fingerprint(all_triplets, all_transitions) -> str:
+    """Content fingerprint of the processing results, used to key memoized outputs"""
+    digest = hashlib.sha256()
+    for triplet in all_triplets:
+        for field in (triplet['paragraph_a'], triplet['transition'], triplet['paragraph_b']):
+            digest.update(field.encode('utf-8'))
+            digest.update(b'\0')
+    digest.update(b'\1')
+    for transition in all_transitions:
+        digest.update(transition.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
 
+def combine_fingerprints(fingerprints) -> str:
+    """Fingerprint of concatenated results from the per-file fingerprints, in order"""
+    return hashlib.sha256("\n".join(fingerprints).encode('ascii')).hexdigest()
 
-def find_sentence_boundaries(text: str) -> List[int]:
-    """Find sentence boundaries in text, handling various edge cases"""
-    boundaries = [0]  # Start of text
-    
-    # Improved sentence boundary detection
-    sentence_endings = re.finditer(r'[.!?]+(?:\s+|$)', text)
-    
-    for match in sentence_endings:
-        end_pos = match.end()
-        # Skip abbreviations and numbers
-        before_match = text[max(0, match.start()-10):match.start()]
-        if not re.search(r'\b(?:M|Mme|Dr|St|etc|vs|cf|p|pp|vol|n°|art)\.$', before_match, re.IGNORECASE):
-            boundaries.append(end_pos)
-    
-    # Also add paragraph boundaries as potential sentence boundaries
-    paragraph_breaks = re.finditer(r'\n\s*\n', text)
-    for match in paragraph_breaks:
-        boundaries.append(match.end())
-    
-    boundaries.append(len(text))  # End of text
-    return sorted(list(set(boundaries)))
+def update_session_results(uploads: List[Tuple[str, str]], new_results: Dict[str, Tuple]):
+    """Fold freshly processed files into the per-file results kept in session state.
 
+    uploads lists (filename, content hash) of the current upload in order;
+    new_results maps content hash to the process_document result of every file
+    that was (re)processed. Results of files no longer uploaded are dropped.
+    When the upload only grew at the end, the aggregated triplets, transitions
+    and fingerprint are extended instead of rebuilt.
+    """
+    file_results = st.session_state['file_results']
+    file_results.update(new_results)
+    order = [file_hash for _, file_hash in uploads]
+    for file_hash in set(file_results) - set(order):
+        del file_results[file_hash]
+    parsed_documents = st.session_state['parsed_documents']
+    for file_hash in set(parsed_documents) - set(order):
+        del parsed_documents[file_hash]
 
-def extract_context_around_transition(main_paragraph: str, transition: str, transition_variations: List[str]) -> List[Dict]:
-    """Extract exactly one sentence before and after each transition occurrence - FOCUSED DEBUG"""
-    triplets = []
-    
-    # Only debug the "Enfin" transition
-    if "Enfin" in transition:
-        print(f"\n=== DEBUGGING ENFIN TRANSITION ===")
-        print(f"Looking for: '{transition}'")
-        print(f"Main paragraph length: {len(main_paragraph)}")
-        
-        # Check if "enfin" exists in the text at all
-        enfin_pos = main_paragraph.lower().find("enfin")
-        if enfin_pos == -1:
-            print("❌ 'enfin' NOT FOUND in main paragraph at all!")
-            print(f"Last 200 chars of paragraph: ...{main_paragraph[-200:]}")
-            return []
-        else:
-            print(f"✅ Found 'enfin' at position {enfin_pos}")
-            # Show context around enfin
-            start = max(0, enfin_pos - 50)
-            end = min(len(main_paragraph), enfin_pos + 100)
-            print(f"Context: ...{main_paragraph[start:end]}...")
-        
-        # Check each variation
-        print(f"Testing {len(transition_variations)} variations:")
-        for i, var in enumerate(transition_variations[:3]):  # Only show first 3
-            found = main_paragraph.lower().find(var.lower())
-            print(f"  {i+1}. '{var}' -> {'FOUND' if found != -1 else 'NOT FOUND'}")
-    
-    # Find all transition positions in the text
-    transition_positions = []
-    
-    for variation in transition_variations:
-        if not variation.strip():
-            continue
-            
-        text_lower = main_paragraph.lower()
-        var_lower = variation.lower().strip()
-        
-        start_pos = 0
-        while True:
-            pos = text_lower.find(var_lower, start_pos)
-            if pos == -1:
-                break
-            
-            actual_text = main_paragraph[pos:pos + len(variation)]
-            transition_positions.append((pos, pos + len(variation), actual_text, transition))
-            start_pos = pos + 1
-    
-    # Only log summary for "Enfin"
-    if "Enfin" in transition:
-        print(f"Total matches found: {len(transition_positions)}")
-        if len(transition_positions) == 0:
-            print("❌ NO MATCHES - This is the problem!")
-            return []
-    
-    # Remove duplicates and sort by position
-    unique_positions = []
-    for pos_info in transition_positions:
-        is_duplicate = False
-        for existing in unique_positions:
-            if abs(existing[0] - pos_info[0]) < 5:
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_positions.append(pos_info)
-    
-    unique_positions.sort(key=lambda x: x[0])
-    
-    # Process each transition occurrence
-    for trans_start, trans_end, actual_transition, original_transition in unique_positions:
-        # Find exactly one sentence before the transition
-        text_before = main_paragraph[:trans_start]
-        sentences_before = re.split(r'(?<=[.!?])\s+', text_before.strip())
-        sentences_before = [s.strip() for s in sentences_before if s.strip()]
-        
-        if sentences_before:
-            para_a_text = sentences_before[-1].strip()
-        else:
-            para_a_text = text_before.strip()
-        
-        if para_a_text and not para_a_text.endswith(('.', '!', '?')):
-            para_a_text += '.'
-        
-        # Find exactly one sentence after the transition
-        text_after = main_paragraph[trans_end:].strip()
-        text_after = re.sub(r'^[,\s]+', '', text_after)
-        
-        sentence_match = re.search(r'^[^.!?]*[.!?](?=\s|$)', text_after)
-        
-        if sentence_match:
-            para_b_text = sentence_match.group().strip()
-        else:
-            first_part = text_after.split('\n')[0]
-            if len(first_part) > 100:
-                para_b_text = first_part[:100].strip() + '.'
-            else:
-                para_b_text = first_part.strip()
-                if para_b_text and not para_b_text.endswith(('.', '!', '?')):
-                    para_b_text += '.'
-        
-        # Validate minimum content length
-        if len(para_a_text) < 10 or len(para_b_text) < 10:
-            continue
-        
-        # Create triplet
-        triplet = {
-            'paragraph_a': para_a_text,
-            'transition': original_transition,
-            'paragraph_b': para_b_text
-        }
-        
-        # Only log result for "Enfin"
-        if "Enfin" in transition:
-            print(f"✅ CREATED ENFIN TRIPLET:")
-            print(f"  A: '{triplet['paragraph_a'][:50]}...'")
-            print(f"  B: '{triplet['paragraph_b'][:50]}...'")
-        
-        # Check for duplicates
-        is_duplicate = False
-        for existing in triplets:
-            if (existing['paragraph_a'] == para_a_text and 
-                existing['paragraph_b'] == para_b_text and
-                existing['transition'] == original_transition):
-                is_duplicate = True
-                break
-        
-        if not is_duplicate:
-            triplets.append(triplet)
-    
-    return triplets
+    previous_order = st.session_state['aggregated_order']
+    if order[:len(previous_order)] == previous_order and not new_results.keys() & set(previous_order):
+        appended = order[len(previous_order):]
+    else:
+        st.session_state['all_triplets'] = []
+        st.session_state['all_transitions'] = []
+        st.session_state['file_fingerprints'] = []
+        appended = order
+    for file_hash in appended:
+        triplets, transitions, _, _ = file_results[file_hash]
+        st.session_state['all_triplets'].extend(triplets)
+        st.session_state['all_transitions'].extend(transitions)
+        st.session_state['file_fingerprints'].append(results_fingerprint(triplets, transitions))
+    st.session_state['aggregated_order'] = order
+    st.session_state['results_fingerprint'] = combine_fingerprints(st.session_state['file_fingerprints'])
 
+    processed_files = []
+    debug_info_all = []
+    for filename, file_hash in uploads:
+        triplets, transitions, _, debug_info = file_results[file_hash]
+        processed_files.append({
+            'filename': filename,
+            'triplets_count': len(triplets),
+            'transitions_count': len(transitions)
+        })
+        debug_info_all.append({
+            'filename': filename,
+            **debug_info
+        })
+    st.session_state['processed_files'] = processed_files
+    st.session_state['debug_info'] = debug_info_all
 
-def generate_outputs(all_triplets, all_transitions):
-    """Generate various output formats from the extracted data."""
-    # Count transition occurrences
-    transition_counts = Counter([t['transition'] for t in all_triplets])
-    
-    # Cap each transition at 3 uses
-    capped_triplets = []
-    transition_usage = Counter()
-    
-    for triplet in all_triplets:
-        transition = triplet['transition']
-        if transition_usage[transition] < 3:
-            capped_triplets.append(triplet)
-            transition_usage[transition] += 1
-    
-    # 1. fewshot_examples.json
-    fewshot_json = json.dumps(capped_triplets, indent=2, ensure_ascii=False)
-    
-    # 2. fewshots_rejected.txt
-    rejected_transitions = []
-    for transition, count in transition_counts.items():
-        if count > 3:
-            rejected_transitions.append(f"{transition}: {count}")
-    fewshots_rejected_txt = "\n".join(rejected_transitions)
-    
-    # 3. transitions_only.txt
-    transitions_txt = "\n".join(sorted(set(all_transitions)))
-    
-    # 4. transitions_only_rejected.txt
-    transition_counts_all = Counter(all_transitions)
-    transitions_rejected = []
-    for transition, count in transition_counts_all.items():
-        if count > 1:
-            transitions_rejected.append(f"{transition}: {count}")
-    transitions_only_rejected_txt = "\n".join(transitions_rejected)
-    
-    # 5. fewshot_examples.jsonl
-    jsonl_examples = []
-    for triplet in capped_triplets:
-        example = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that continues text based on the given context."
-                },
-                {
-                    "role": "user",
-                    "content": f"{triplet['paragraph_a']} {triplet['transition']}"
-                },
-                {
-                    "role": "assistant",
-                    "content": triplet['paragraph_b']
-                }
-            ]
-        }
-        jsonl_examples.append(json.dumps(example, ensure_ascii=False))
-    
-    fewshot_jsonl = "\n".join(jsonl_examples)
-    
-    # 6. fewshots-fineTuning_rejected.txt
-    finetuning_rejected = []
-    for transition, count in transition_counts.items():
-        if count > 3:
-            finetuning_rejected.append(f"{transition}: {count}")
-    fewshots_finetuning_rejected_txt = "\n".join(finetuning_rejected)
-    
-    return (
-        fewshot_json, 
-        transitions_txt, 
-        fewshot_jsonl, 
-        fewshots_rejected_txt,
-        transitions_only_rejected_txt,
-        fewshots_finetuning_rejected_txt,
-        len(capped_triplets)
-    )
+def memoized(key: str, fingerprint: str, compute):
+    """Return the value stored under key in session state, recomputing it only when fingerprint changes"""
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, compute())
+        st.session_state[key] = cached
+    return cached[1]
 
-def create_download_zip(fewshot_json, transitions_txt, fewshot_jsonl, 
-                       fewshots_rejected_txt, transitions_only_rejected_txt, 
-                       fewshots_finetuning_rejected_txt):
-    """Create a ZIP file containing all output files."""
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, 'w') as zip_file:
-        zip_file.writestr('fewshot_examples.json', fewshot_json)
-        zip_file.writestr('transitions_only.txt', transitions_txt)
-        zip_file.writestr('fewshot_examples.jsonl', fewshot_jsonl)
-        zip_file.writestr('fewshots_rejected.txt', fewshots_rejected_txt)
-        zip_file.writestr('transitions_only_rejected.txt', transitions_only_rejected_txt)
-        zip_file.writestr('fewshots-fineTuning_rejected.txt', fewshots_finetuning_rejected_txt)
-    
-    buffer.seek(0)
-    return buffer.getvalue()
+def preview_text(text: str, limit: int = 2000) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
 
 def main():
     # Initialize session state variables if they don't exist
@@ -461,6 +169,16 @@ def main():
     if 'outputs' not in st.session_state:
         st.session_state['outputs'] = {}
     
+    # Per-file results keyed by content hash, so re-processing only touches new uploads
+    if 'file_results' not in st.session_state:
+        st.session_state['file_results'] = {}
+        st.session_state['aggregated_order'] = []
+        st.session_state['file_fingerprints'] = []
+    
+    # Documents parsed by the extraction, reused by the GPT examples
+    if 'parsed_documents' not in st.session_state:
+        st.session_state['parsed_documents'] = {}
+    
     st.set_page_config(
         page_title="Transition Extractor",
         page_icon="📄",
@@ -482,40 +200,119 @@ def main():
     if uploaded_files:
         st.success(f"Uploaded {len(uploaded_files)} file(s)")
         
+        worker_count = st.number_input(
+            "Worker processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Process documents in parallel on several CPU cores (1 = sequential)"
+        )
+        use_cache = st.checkbox(
+            "Reuse cached results for unchanged files",
+            value=True,
+            help="Skip re-extraction of files whose content was already processed by this version of the extractor"
+        )
+        collect_metrics = st.checkbox(
+            "Collect stage timings",
+            value=False,
+            help="Record per-stage timings and counters for each file (shown in the debug information)"
+        )
+        st.session_state['collect_metrics'] = collect_metrics
+        
         # Process documents
         if st.button("🔍 Process Documents", type="primary"):
             with st.spinner("Processing documents..."):
-                all_triplets = []
-                all_transitions = []
-                processed_files = []
-                debug_info_all = []
+                uploads = [(f.name, content_hash(f.getvalue())) for f in uploaded_files]
+                file_results = st.session_state['file_results']
+                
+                # Only files not seen yet in this session (or that failed) are processed
+                pending = {}
+                for uploaded_file, (_, file_hash) in zip(uploaded_files, uploads):
+                    previous = file_results.get(file_hash)
+                    if (previous is None or 'error' in previous[3]) and file_hash not in pending:
+                        pending[file_hash] = uploaded_file
                 
                 progress_bar = st.progress(0)
+                progress = ProgressBus([lambda event: progress_bar.progress(event.fraction)])
+                cache = get_document_cache() if use_cache else None
                 
-                for i, uploaded_file in enumerate(uploaded_files):
-                    triplets, transitions, filename, debug_info = process_document(uploaded_file)
-                    all_triplets.extend(triplets)
-                    all_transitions.extend(transitions)
-                    processed_files.append({
-                        'filename': filename,
-                        'triplets_count': len(triplets),
-                        'transitions_count': len(transitions)
-                    })
-                    debug_info_all.append({
-                        'filename': filename,
-                        **debug_info
-                    })
-                    
-                    progress_bar.progress((i + 1) / len(uploaded_files))
+                if worker_count > 1 and len(pending) > 1:
+                    parsed_documents = {}
+                    results = process_documents_parallel(
+                        [(f.name, f.getvalue()) for f in pending.values()],
+                        max_workers=int(worker_count),
+                        progress=progress,
+                        cache=cache,
+                        collect_metrics=collect_metrics,
+                        parsed_documents=parsed_documents
+                    )
+                    pending_hashes = list(pending)
+                    for i, document in parsed_documents.items():
+                        st.session_state['parsed_documents'][pending_hashes[i]] = document
+                    for _, _, filename, debug_info in results:
+                        if 'error' in debug_info:
+                            st.error(f"Error processing {filename}: {debug_info['error']}")
+                else:
+                    results = []
+                    for i, uploaded_file in enumerate(pending.values()):
+                        results.append(process_document(uploaded_file, cache, collect_metrics))
+                        progress.emit('documents', i + 1, len(pending), uploaded_file.name)
+                progress_bar.progress(1.0)
                 
-                # Store results in session state
-                st.session_state['all_triplets'] = all_triplets
-                st.session_state['all_transitions'] = all_transitions
-                st.session_state['processed_files'] = processed_files
-                st.session_state['debug_info'] = debug_info_all
+                update_session_results(uploads, dict(zip(pending, results)))
                 
-                st.success("✅ Processing complete!")
-    
+                st.success(
+                    f"✅ Processing complete! {len(pending)} file(s) processed, "
+                    f"{len(uploads) - len(pending)} reused from this session."
+                )
+
+        # Optional GPT few-shot examples built from the long paragraphs
+        with st.expander("🧠 GPT few-shot examples (optional)"):
+            gpt_model = st.text_input("Model", value="gpt-4")
+            gpt_concurrency = st.number_input(
+                "Concurrent requests",
+                min_value=1,
+                max_value=20,
+                value=5,
+                help="GPT requests in flight at once per document (1 = one paragraph at a time)"
+            )
+            gpt_limit = st.number_input(
+                "Maximum examples per document (0 = no limit)",
+                min_value=0,
+                value=0
+            )
+            if st.button("🧠 Build GPT few-shot examples"):
+                with st.spinner("Asking GPT..."):
+                    per_document_outputs = []
+                    for uploaded_file in uploaded_files:
+                        try:
+                            document = get_parsed_document(uploaded_file, content_hash(uploaded_file.getvalue()))
+                            per_document_outputs.append(extract_few_shot_examples_and_jsonl(
+                                document,
+                                use_gpt=True,
+                                model=gpt_model,
+                                limit=int(gpt_limit) or None,
+                                concurrency=int(gpt_concurrency)
+                            ))
+                        except Exception as e:
+                            st.error(f"Error building GPT examples for {uploaded_file.name}: {str(e)}")
+                    gpt_json, gpt_jsonl, gpt_examples = combine_few_shot_outputs(per_document_outputs)
+                st.session_state['gpt_outputs'] = {'json': gpt_json, 'jsonl': gpt_jsonl}
+                st.success(f"✅ Built {gpt_examples} GPT few-shot example(s)")
+            if st.session_state.get('gpt_outputs'):
+                st.download_button(
+                    "📄 Download gpt_fewshot_examples.json",
+                    st.session_state['gpt_outputs']['json'],
+                    "gpt_fewshot_examples.json",
+                    "application/json"
+                )
+                st.download_button(
+                    "📄 Download gpt_fewshot_examples.jsonl",
+                    st.session_state['gpt_outputs']['jsonl'],
+                    "gpt_fewshot_examples.jsonl",
+                    "application/jsonl"
+                )
+
     # Show results if available
     if 'all_triplets' in st.session_state and st.session_state['all_triplets']:
         st.header("2. Processing Results")
@@ -542,10 +339,21 @@ def main():
             with st.expander("🔍 Debug Information (Click to expand)"):
                 for debug in st.session_state['debug_info']:
                     st.write(f"**{debug['filename']}**:")
+                    if 'error' in debug:
+                        st.write(f"- Error: {debug['error']}")
+                        st.write("---")
+                        continue
                     st.write(f"- Text length: {debug['text_length']} characters")
                     st.write(f"- Markers found: {debug.get('marker_count', 0)}")
                     st.write(f"- Articles processed: {debug.get('articles_processed', 0)}")
                     st.write(f"- Total transitions found: {debug['transition_lines_found']}")
+                    if debug.get('metrics'):
+                        st.write("**Stage timings:**")
+                        st.table([
+                            {'stage': stage, 'ms': round(values['seconds'] * 1000, 2), 'calls': values['calls']}
+                            for stage, values in debug['metrics']['stages'].items()
+                        ])
+                        st.write(", ".join(f"{name}: {value}" for name, value in debug['metrics']['counters'].items()))
                     
                     # Show found transitions
                     if debug['found_transitions']:
@@ -564,6 +372,26 @@ def main():
                             key=f"debug_{debug['filename']}"
                         )
                     st.write("---")
+
+                per_file_metrics = [(d['filename'], d.get('metrics')) for d in st.session_state['debug_info']]
+                if st.session_state.get('output_metrics'):
+                    per_file_metrics.append(('(outputs)', st.session_state['output_metrics']))
+                if any(metrics for _, metrics in per_file_metrics):
+                    metrics_col1, metrics_col2 = st.columns(2)
+                    with metrics_col1:
+                        st.download_button(
+                            "📈 Metrics (JSON)",
+                            METRICS_FORMATS['json'](per_file_metrics),
+                            file_name="metrics.json",
+                            mime="application/json"
+                        )
+                    with metrics_col2:
+                        st.download_button(
+                            "📈 Metrics (Prometheus)",
+                            METRICS_FORMATS['prometheus'](per_file_metrics),
+                            file_name="metrics.prom",
+                            mime="text/plain"
+                        )
         
         # Generate outputs
         st.header("3. Generate Outputs")
@@ -588,25 +416,73 @@ def main():
             ]
         )
         
+        drop_near_duplicates = st.checkbox(
+            "Drop near-duplicate triplets",
+            value=False,
+            help="Suppress triplets whose sentences nearly repeat an earlier triplet (e.g. wire-service boilerplate)"
+        )
+        near_duplicate_threshold = st.slider(
+            "Near-duplicate similarity threshold",
+            min_value=0.5,
+            max_value=1.0,
+            value=0.8,
+            step=0.05,
+            disabled=not drop_near_duplicates
+        )
+        
         if st.button("🔄 Generate Outputs"):
             with st.spinner("Generating outputs..."):
-                fewshot_json, transitions_txt, fewshot_jsonl, fewshots_rejected_txt, \
-                transitions_only_rejected_txt, fewshots_finetuning_rejected_txt, valid_examples = generate_outputs(
-                    st.session_state['all_triplets'], 
+                fingerprint = st.session_state.get('results_fingerprint') or results_fingerprint(
+                    st.session_state['all_triplets'],
                     st.session_state['all_transitions']
                 )
+                if drop_near_duplicates:
+                    fingerprint = f"{fingerprint}:near-duplicates:{near_duplicate_threshold}"
+                output_metrics = StageMetrics() if st.session_state.get('collect_metrics') else None
+                
+                def build_outputs():
+                    triplets = st.session_state['all_triplets']
+                    near_duplicates = None
+                    if drop_near_duplicates:
+                        near_duplicates = NearDuplicateFilter(near_duplicate_threshold)
+                        triplets = list(near_duplicates.filter(triplets))
+                    outputs = generate_outputs(triplets, st.session_state['all_transitions'])
+                    if near_duplicates is None:
+                        return outputs, None, 0
+                    return outputs, near_duplicates.report(), near_duplicates.suppressed_count
+                
+                def compute_outputs():
+                    if output_metrics is None:
+                        return build_outputs()
+                    with output_metrics.stage('output_generation'):
+                        return build_outputs()
+                
+                (fewshot_json, transitions_txt, fewshot_jsonl, fewshots_rejected_txt,
+                 transitions_only_rejected_txt, fewshots_finetuning_rejected_txt, valid_examples), \
+                near_duplicates_txt, near_duplicates_suppressed = memoized(
+                    'generated_outputs_cache',
+                    fingerprint,
+                    compute_outputs
+                )
+                if output_metrics is not None and output_metrics.calls:
+                    output_metrics.count('valid_examples', valid_examples)
+                    st.session_state['output_metrics'] = output_metrics.as_dict()
                 
                 st.session_state['outputs'] = {
+                    'fingerprint': fingerprint,
                     'fewshot_json': fewshot_json,
                     'transitions_txt': transitions_txt,
                     'fewshot_jsonl': fewshot_jsonl,
                     'fewshots_rejected_txt': fewshots_rejected_txt,
                     'transitions_only_rejected_txt': transitions_only_rejected_txt,
                     'fewshots_finetuning_rejected_txt': fewshots_finetuning_rejected_txt,
-                    'valid_examples': valid_examples
+                    'valid_examples': valid_examples,
+                    'near_duplicates_txt': near_duplicates_txt
                 }
                 
                 st.success(f"✅ Generated outputs with {valid_examples} valid examples!")
+                if near_duplicates_txt is not None:
+                    st.info(f"Suppressed {near_duplicates_suppressed} near-duplicate triplet(s)")
     
     # Download section
     if 'outputs' in st.session_state and st.session_state['outputs']:
@@ -666,17 +542,29 @@ def main():
                     "fewshots-fineTuning_rejected.txt",
                     "text/plain"
                 )
+            
+            if outputs.get('near_duplicates_txt') is not None:
+                st.download_button(
+                    f"📄 Download {NEAR_DUPLICATES_FILENAME}",
+                    outputs['near_duplicates_txt'],
+                    NEAR_DUPLICATES_FILENAME,
+                    "text/plain"
+                )
         
         # ZIP download
         st.subheader("Download All Files")
-        zip_data = create_download_zip(
+        zip_data = memoized('download_zip_cache', outputs.get('fingerprint'), lambda: create_download_zip(
             outputs['fewshot_json'],
             outputs['transitions_txt'], 
             outputs['fewshot_jsonl'],
             outputs['fewshots_rejected_txt'],
             outputs['transitions_only_rejected_txt'],
-            outputs['fewshots_finetuning_rejected_txt']
-        )
+            outputs['fewshots_finetuning_rejected_txt'],
+            extra_files=(
+                {NEAR_DUPLICATES_FILENAME: outputs['near_duplicates_txt']}
+                if outputs.get('near_duplicates_txt') is not None else None
+            )
+        ))
         
         st.download_button(
             "📦 Download All Files (ZIP)",
@@ -700,18 +588,19 @@ def main():
             ]
         )
         
-        if preview_format == 'fewshot_examples.json':
-            st.code(outputs['fewshot_json'][:2000] + "..." if len(outputs['fewshot_json']) > 2000 else outputs['fewshot_json'], language='json')
-        elif preview_format == 'transitions_only.txt':
-            st.text(outputs['transitions_txt'][:2000] + "..." if len(outputs['transitions_txt']) > 2000 else outputs['transitions_txt'])
-        elif preview_format == 'fewshot_examples.jsonl':
-            st.code(outputs['fewshot_jsonl'][:2000] + "..." if len(outputs['fewshot_jsonl']) > 2000 else outputs['fewshot_jsonl'], language='json')
-        elif preview_format == 'fewshots_rejected.txt':
-            st.text(outputs['fewshots_rejected_txt'][:2000] + "..." if len(outputs['fewshots_rejected_txt']) > 2000 else outputs['fewshots_rejected_txt'])
-        elif preview_format == 'transitions_only_rejected.txt':
-            st.text(outputs['transitions_only_rejected_txt'][:2000] + "..." if len(outputs['transitions_only_rejected_txt']) > 2000 else outputs['transitions_only_rejected_txt'])
-        elif preview_format == 'fewshots-fineTuning_rejected.txt':
-            st.text(outputs['fewshots_finetuning_rejected_txt'][:2000] + "..." if len(outputs['fewshots_finetuning_rejected_txt']) > 2000 else outputs['fewshots_finetuning_rejected_txt'])
+        previews = memoized('preview_cache', outputs.get('fingerprint'), lambda: {
+            'fewshot_examples.json': preview_text(outputs['fewshot_json']),
+            'transitions_only.txt': preview_text(outputs['transitions_txt']),
+            'fewshot_examples.jsonl': preview_text(outputs['fewshot_jsonl']),
+            'fewshots_rejected.txt': preview_text(outputs['fewshots_rejected_txt']),
+            'transitions_only_rejected.txt': preview_text(outputs['transitions_only_rejected_txt']),
+            'fewshots-fineTuning_rejected.txt': preview_text(outputs['fewshots_finetuning_rejected_txt'])
+        })
+        
+        if preview_format in ('fewshot_examples.json', 'fewshot_examples.jsonl'):
+            st.code(previews[preview_format], language='json')
+        else:
+            st.text(previews[preview_format])
         
         # Show sample triplets
         st.header("6. Sample Triplets")
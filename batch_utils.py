@@ -0,0 +1,110 @@
+"""Offline Batch-API mode for the GPT few-shot builder.
+
+write_batch_requests renders every build_fewshots_with_gpt prompt into a
+requests.jsonl for the provider's Batch API; ingest_batch_results reads the
+returned results file back into the few-shot examples and JSONL produced by
+extract_few_shot_examples_and_jsonl.
+"""
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from prompt_utils import FEWSHOT_TEMPERATURE, build_fewshot_prompt, parse_fewshot_output
+from extract_fewshots import extract_gpt_inputs, format_few_shot_outputs
+from document_utils import ParsedDocument
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def batch_custom_id(position: int, filename: str, index: int) -> str:
+    """Stable request id: document position in the batch, file name and paragraph position.
+
+    Results may come back in any order; the positions restore the request order.
+    """
+    return f"{position:04d}/{filename}#{index:04d}"
+
+
+def parse_custom_id(custom_id: str) -> Tuple[int, str, int]:
+    position, rest = custom_id.split('/', 1)
+    filename, index = rest.rsplit('#', 1)
+    return int(position), filename, int(index)
+
+
+def write_batch_requests(doc_paths: List, requests_path: str, model="gpt-4") -> int:
+    """Write one chat-completion request per long paragraph of every document; return the request count
+
+    doc_paths holds .docx paths or ParsedDocuments.
+    """
+    filenames = [
+        path.filename if isinstance(path, ParsedDocument) else os.path.basename(path)
+        for path in doc_paths
+    ]
+    duplicates = sorted({name for name in filenames if filenames.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Document file names must be unique within a batch: {', '.join(duplicates)}")
+
+    count = 0
+    with open(requests_path, 'w', encoding='utf-8') as f:
+        for position, (path, filename) in enumerate(zip(doc_paths, filenames)):
+            transitions, long_paragraphs = extract_gpt_inputs(path)
+            for index, paragraph in enumerate(long_paragraphs):
+                f.write(json.dumps({
+                    "custom_id": batch_custom_id(position, filename, index),
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": model,
+                        "messages": [{"role": "user", "content": build_fewshot_prompt(paragraph, transitions)}],
+                        "temperature": FEWSHOT_TEMPERATURE,
+                    }
+                }, ensure_ascii=False) + "\n")
+                count += 1
+    return count
+
+
+def _result_output(result: Dict) -> str:
+    """Completion text of a batch result line; raises if the request failed"""
+    if result.get('error'):
+        raise ValueError(result['error'].get('message', result['error']))
+    response = result.get('response') or {}
+    if response.get('status_code') != 200:
+        raise ValueError(f"status {response.get('status_code')}")
+    return response['body']['choices'][0]['message']['content'].strip()
+
+
+def ingest_batch_results(results_path: str, limit=None) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+    """Turn a Batch API results file into per-document (few-shot JSON, JSONL) outputs.
+
+    Returns ({filename: (fewshot_json, fewshot_jsonl)}, errors). Documents and
+    paragraphs are put back in request order whatever order the results
+    arrive in; a failed request, or a completion that is not a JSON list of
+    examples, contributes no examples and one error line.
+    limit caps the examples per document like extract_few_shot_examples_and_jsonl.
+    """
+    fewshots_by_doc = defaultdict(dict)
+    errors = []
+    with open(results_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result['custom_id']
+            position, filename, index = parse_custom_id(custom_id)
+            try:
+                fewshots = parse_fewshot_output(_result_output(result), strict=True)
+            except Exception as e:
+                errors.append(f"{custom_id}: {e}")
+                fewshots = []
+            fewshots_by_doc[position, filename][index] = fewshots
+
+    outputs = {}
+    for position, filename in sorted(fewshots_by_doc):
+        all_results = []
+        paragraphs = fewshots_by_doc[position, filename]
+        for index in sorted(paragraphs):
+            all_results.extend(paragraphs[index])
+        if limit:
+            all_results = all_results[:limit]
+        outputs[filename] = format_few_shot_outputs(all_results)
+    return outputs, errors
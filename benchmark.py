@@ -0,0 +1,141 @@
+"""Benchmark the extraction pipeline stage by stage on synthetic corpora.
+
+    python benchmark.py                      # small and medium corpora
+    python benchmark.py --sizes huge --json bench.json
+
+For every stage the report gives wall time, throughput and the peak Python
+heap allocated while the stage ran (tracemalloc, measured in a second pass so
+it does not distort the timings). MB/s is over the bytes the stage itself
+handles: .docx bytes for loading and extraction, main paragraph text (once
+per transition searched) for context extraction, generated file contents
+for the outputs.
+"""
+import argparse
+import gc
+import io
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from synthetic_corpus import document_seed, generate_articles, build_docx
+from docx_reader import iter_paragraphs
+from pipeline import extract_document, extract_context_around_transition
+from output_utils import generate_outputs
+
+PRESETS = {
+    'small': dict(documents=10, articles=3, sentences=20, transitions=5),
+    'medium': dict(documents=100, articles=5, sentences=40, transitions=8),
+    'huge': dict(documents=500, articles=10, sentences=80, transitions=12),
+}
+
+
+def build_corpus(documents: int, articles: int, sentences: int, transitions: int, seed: int = 0):
+    """Return ([(filename, docx bytes)], [(main paragraph, transitions)]) for a synthetic corpus"""
+    files = []
+    article_inputs = []
+    for i in range(documents):
+        doc_articles = generate_articles(document_seed(seed, i), articles, sentences, transitions)
+        files.append((f"synthetic_{i:05d}.docx", build_docx([p for article in doc_articles for p in article])))
+        article_inputs.extend((article[3], article[5:]) for article in doc_articles)
+    return files, article_inputs
+
+
+def _measure(run: Callable[[], Tuple[int, int]], with_memory: bool) -> Dict:
+    """Time run(), which returns (items, bytes handled)"""
+    gc.collect()
+    start = time.perf_counter()
+    items, stage_bytes = run()
+    seconds = time.perf_counter() - start
+
+    peak_bytes = None
+    if with_memory:
+        gc.collect()
+        tracemalloc.start()
+        run()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': seconds, 'items': items, 'stage_bytes': stage_bytes, 'peak_bytes': peak_bytes}
+
+
+def benchmark_corpus(name: str, params: Dict, with_memory: bool = True) -> List[Dict]:
+    files, article_inputs = build_corpus(**params)
+    input_bytes = sum(len(data) for _, data in files)
+    extraction_results = []
+
+    def docx_load():
+        return sum(len(list(iter_paragraphs(io.BytesIO(data)))) for _, data in files), input_bytes
+
+    def process_documents():
+        extraction_results[:] = [extract_document(io.BytesIO(data), filename) for filename, data in files]
+        return len(files), input_bytes
+
+    def context_extraction():
+        triplets = 0
+        text_bytes = 0
+        for main_paragraph, transitions in article_inputs:
+            paragraph_bytes = len(main_paragraph.encode('utf-8'))
+            for transition in transitions:
+                triplets += len(extract_context_around_transition(main_paragraph, transition))
+                text_bytes += paragraph_bytes
+        return triplets, text_bytes
+
+    def output_generation():
+        all_triplets = [t for result in extraction_results for t in result[0]]
+        all_transitions = [t for result in extraction_results for t in result[1]]
+        *files_content, examples = generate_outputs(all_triplets, all_transitions)
+        return examples, sum(len(content.encode('utf-8')) for content in files_content)
+
+    stages = [
+        ('docx_load', docx_load, 'paragraphs'),
+        ('process_document', process_documents, 'documents'),
+        ('extract_context', context_extraction, 'triplets'),
+        ('generate_outputs', output_generation, 'examples'),
+    ]
+    report = []
+    for stage, run, unit in stages:
+        result = _measure(run, with_memory)
+        report.append({
+            'corpus': name,
+            'stage': stage,
+            'unit': unit,
+            'input_mb': input_bytes / 1e6,
+            **result,
+            'items_per_second': result['items'] / result['seconds'] if result['seconds'] else None,
+            'mb_per_second': result['stage_bytes'] / 1e6 / result['seconds'] if result['seconds'] else None,
+        })
+    return report
+
+
+def format_report(rows: List[Dict]) -> str:
+    lines = [f"{'corpus':<8} {'stage':<18} {'seconds':>9} {'items':>9} {'items/s':>11} {'MB/s':>8} {'peak MB':>8}"]
+    for row in rows:
+        peak = f"{row['peak_bytes'] / 1e6:8.1f}" if row['peak_bytes'] is not None else f"{'-':>8}"
+        lines.append(
+            f"{row['corpus']:<8} {row['stage']:<18} {row['seconds']:9.3f} {row['items']:>9} "
+            f"{row['items_per_second'] or 0:11.1f} {row['mb_per_second'] or 0:8.2f} {peak}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the transition extraction pipeline")
+    parser.add_argument('--sizes', nargs='+', choices=sorted(PRESETS), default=['small', 'medium'])
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--json', help="also write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name in args.sizes:
+        rows.extend(benchmark_corpus(name, PRESETS[name], with_memory=not args.no_memory))
+
+    print(format_report(rows))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
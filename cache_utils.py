@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from triplet_utils import pack_triplets, unpack_triplets
+
+# Source files whose content defines the extractor version: editing any of
+# them invalidates every cached extraction result.
+EXTRACTION_MODULES = (
+    'pipeline.py',
+    'matcher_utils.py',
+    'sentence_utils.py',
+    'dedup_utils.py',
+    'docx_reader.py',
+    'segment_utils.py',
+    'triplet_utils.py',
+    'normalize_utils.py',
+    'document_utils.py',
+)
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'TRANSITION_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'transition_processor', 'documents.sqlite3')
+)
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+DEFAULT_PROMPT_CACHE_PATH = os.environ.get(
+    'TRANSITION_PROMPT_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'transition_processor', 'prompts.sqlite3')
+)
+DEFAULT_PROMPT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_PROMPT_CACHE_TTL = 30 * 24 * 3600
+
+
+def extractor_version() -> str:
+    """Hash of the extraction source code, used to invalidate stale cache entries"""
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in EXTRACTION_MODULES:
+        digest.update(module.encode('utf-8'))
+        with open(os.path.join(base_dir, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentCache:
+    """Content-addressed, size-bounded LRU cache of extract_document results.
+
+    Entries are keyed by the SHA-256 of the .docx bytes and stored in SQLite
+    together with the extractor version; entries of another version are
+    dropped when the cache is opened. One instance may be shared by threads
+    (e.g. Streamlit sessions): its connection is only used under a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 version: Optional[str] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or extractor_version()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " digest TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used)")
+        with self._conn:
+            self._conn.execute("DELETE FROM documents WHERE version != ?", (self.version,))
+
+    def get(self, data: bytes) -> Optional[Tuple[List[Dict], List[str], Dict]]:
+        """Return the cached (triplets, transitions, debug_info) for these file bytes, if any"""
+        digest = content_hash(data)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM documents WHERE digest = ? AND version = ?", (digest, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE documents SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        texts, rows, transitions, debug_info = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        # Triplet records again, not dicts, so cache hits stay as compact as fresh results
+        return unpack_triplets(texts, rows), transitions, debug_info
+
+    def put(self, data: bytes, triplets: List[Dict], transitions: List[str], debug_info: Dict):
+        """Store an extraction result and evict least recently used entries over max_bytes"""
+        payload = zlib.compress(
+            json.dumps([*pack_triplets(triplets), transitions, debug_info], ensure_ascii=False).encode('utf-8')
+        )
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (digest, version, payload, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (content_hash(data), self.version, payload, len(payload), time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries over max_bytes; the caller holds the lock"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in self._conn.execute(
+                "SELECT digest, size FROM documents ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM documents WHERE digest = ?", (digest,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PromptCache:
+    """Persistent cache of model completions keyed by (model, temperature, rendered prompt).
+
+    Stores the raw completion and its parsed JSON in SQLite. Entries older
+    than ttl_seconds are ignored and purged; least recently used entries are
+    evicted once the cache grows over max_bytes. Like DocumentCache, one
+    instance may be shared by threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_PROMPT_CACHE_PATH, max_bytes: int = DEFAULT_PROMPT_CACHE_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_PROMPT_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " raw_output TEXT NOT NULL,"
+            " parsed TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_created_at ON completions (created_at)")
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, temperature, prompt], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _expiry_cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds is not None else float('-inf')
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[Tuple[str, list]]:
+        """Return the cached (raw_output, parsed) for this request, if fresh"""
+        key = self.key(model, temperature, prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT raw_output, parsed, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw_output, parsed, created_at = row
+            with self._conn:
+                if created_at < self._expiry_cutoff():
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+        return raw_output, json.loads(parsed)
+
+    def put(self, model: str, temperature: float, prompt: str, raw_output: str, parsed: list):
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        size = len(raw_output.encode('utf-8')) + len(parsed_json.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, raw_output, parsed, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.key(model, temperature, prompt), model, raw_output, parsed_json, size, now, now)
+            )
+            self._conn.execute("DELETE FROM completions WHERE created_at < ?", (self._expiry_cutoff(),))
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries over max_bytes; the caller holds the lock"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM completions ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completions")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_prompt_cache = None
+_default_prompt_cache_lock = threading.Lock()
+
+def default_prompt_cache() -> PromptCache:
+    """Shared PromptCache at DEFAULT_PROMPT_CACHE_PATH, opened on first use"""
+    global _default_prompt_cache
+    with _default_prompt_cache_lock:
+        if _default_prompt_cache is None:
+            _default_prompt_cache = PromptCache()
+    return _default_prompt_cache
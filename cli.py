@@ -0,0 +1,242 @@
+"""Headless batch entry point: python cli.py INPUT [INPUT ...] -o OUTPUT_DIR
+
+INPUT is a .docx file, a directory (searched for *.docx) or a glob pattern.
+Streamlit is never imported; openai is only imported with --gpt.
+--gpt-batch / --ingest-gpt-batch run the GPT step offline through the Batch API.
+--index INDEX_DB records every occurrence in a persistent index; --from-index
+regenerates the output files from it.
+--metrics PATH writes per-file stage timings as JSON or Prometheus text.
+"""
+import argparse
+import glob
+import os
+import sys
+from itertools import chain
+from typing import List
+
+from pipeline import load_transitions, process_documents_parallel
+from output_utils import NEAR_DUPLICATES_FILENAME, stream_outputs_to_dir, stream_outputs_to_zip
+from cache_utils import DEFAULT_CACHE_PATH, DocumentCache
+from metrics_utils import METRICS_FORMATS, StageMetrics
+from document_utils import parse_document
+from progress_utils import ProgressBus, StreamSink
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+
+def similarity_threshold(value: str) -> float:
+    number = float(value)
+    if not 0 < number <= 1:
+        raise argparse.ArgumentTypeError(f"expected a similarity in (0, 1], got {value}")
+    return number
+
+
+def collect_docx_paths(inputs: List[str]) -> List[str]:
+    """Expand files, directories and glob patterns into a sorted, de-duplicated list of .docx paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, '*.docx'))
+        elif glob.has_magic(item):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        paths.extend(
+            p for p in sorted(matches)
+            if p.lower().endswith('.docx') and not os.path.basename(p).startswith('~$')
+        )
+    return list(dict.fromkeys(paths))
+
+
+def run_gpt_fewshots(paths: List, output_dir: str, model: str, limit=None, use_cache=True, concurrency=1):
+    """Run the GPT few-shot builder over every file (path or ParsedDocument) and write the combined results"""
+    from extract_fewshots import extract_few_shot_examples_and_jsonl
+
+    return write_gpt_outputs(output_dir, [
+        extract_few_shot_examples_and_jsonl(path, use_gpt=True, model=model, limit=limit, use_cache=use_cache,
+                                            concurrency=concurrency)
+        for path in paths
+    ])
+
+
+def write_gpt_outputs(output_dir: str, per_document_outputs) -> int:
+    """Combine per-document (fewshot_json, fewshot_jsonl) pairs into the gpt_fewshot_examples files"""
+    from extract_fewshots import combine_few_shot_outputs
+
+    fewshot_json, fewshot_jsonl, example_count = combine_few_shot_outputs(per_document_outputs)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'gpt_fewshot_examples.json'), 'w', encoding='utf-8') as f:
+        f.write(fewshot_json)
+    with open(os.path.join(output_dir, 'gpt_fewshot_examples.jsonl'), 'w', encoding='utf-8') as f:
+        f.write(fewshot_jsonl)
+    return example_count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Extract transition triplets from .docx news articles")
+    parser.add_argument('inputs', nargs='*', help=".docx files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory the output files are written to")
+    parser.add_argument('--zip', help="also write all output files into this ZIP archive")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count, 1 = sequential)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="extraction cache database")
+    parser.add_argument('--no-cache', action='store_true', help="always re-extract every file")
+    parser.add_argument('--index', metavar='INDEX_DB',
+                        help="add the processed documents to this transition occurrence index")
+    parser.add_argument('--from-index', action='store_true',
+                        help="regenerate the output files from --index instead of processing inputs")
+    parser.add_argument('--near-duplicates', type=similarity_threshold, metavar='THRESHOLD', default=None,
+                        help="drop triplets whose MinHash similarity to an earlier one reaches THRESHOLD (e.g. 0.8)")
+    parser.add_argument('--memory-limit', type=int, metavar='MB', default=None,
+                        help="bound the memory used to aggregate the outputs, spilling to disk beyond it")
+    parser.add_argument('--warm-transitions', metavar='TRANSITIONS_TXT',
+                        help="preload the transition needle table from a saved transitions_only.txt")
+    parser.add_argument('--gpt', action='store_true', help="also build few-shot examples with GPT")
+    parser.add_argument('--model', default='gpt-4', help="model used with --gpt")
+    parser.add_argument('--limit', type=int, default=None, help="maximum GPT examples per document")
+    parser.add_argument('--concurrency', type=positive_int, default=1,
+                        help="GPT requests in flight at once per document (1 = one paragraph at a time)")
+    parser.add_argument('--no-gpt-cache', action='store_true', help="always send GPT requests, ignoring cached completions")
+    parser.add_argument('--gpt-batch', metavar='REQUESTS_JSONL',
+                        help="write the GPT requests for the Batch API to this file instead of calling GPT")
+    parser.add_argument('--ingest-gpt-batch', metavar='RESULTS_JSONL',
+                        help="build the GPT few-shot outputs from a Batch API results file and exit")
+    parser.add_argument('--metrics', metavar='PATH', help="write per-file stage timings and counters to this file")
+    parser.add_argument('--metrics-format', choices=sorted(METRICS_FORMATS), default='json',
+                        help="format of the --metrics file")
+    args = parser.parse_args(argv)
+    memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+
+    if args.ingest_gpt_batch:
+        from batch_utils import ingest_batch_results
+
+        outputs, errors = ingest_batch_results(args.ingest_gpt_batch, limit=args.limit)
+        for error in errors:
+            print(f"Batch request failed: {error}", file=sys.stderr)
+        gpt_examples = write_gpt_outputs(args.output_dir, outputs.values())
+        print(f"Wrote {gpt_examples} GPT few-shot examples from {len(outputs)} documents to {args.output_dir}")
+        return 1 if errors else 0
+    if args.from_index:
+        if not args.index:
+            parser.error("--from-index requires --index")
+        from index_utils import TransitionIndex
+
+        index = TransitionIndex(args.index)
+        valid_examples = index.write_outputs(args.output_dir, memory_limit)
+        print(f"Wrote outputs with {valid_examples} valid examples from {index.document_count()} indexed documents "
+              f"to {args.output_dir}")
+        return 0
+    if not args.inputs:
+        parser.error("at least one input is required")
+
+    paths = collect_docx_paths(args.inputs)
+    if not paths:
+        print("No .docx files found", file=sys.stderr)
+        return 1
+
+    documents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            documents.append((os.path.basename(path), f.read()))
+
+    cache = None if args.no_cache else DocumentCache(args.cache)
+    warm_transitions = load_transitions(args.warm_transitions) if args.warm_transitions else None
+    index = None
+    if args.index:
+        from index_utils import TransitionIndex
+
+        index = TransitionIndex(args.index)
+    # The GPT path reuses the documents parsed for the rule-based extraction
+    parsed_documents = {} if args.gpt or args.gpt_batch else None
+    # Live progress only on a terminal, so redirected output stays clean
+    progress = ProgressBus([StreamSink(sys.stderr)]) if sys.stderr.isatty() else None
+    results = process_documents_parallel(documents, max_workers=args.workers, cache=cache,
+                                         collect_metrics=bool(args.metrics), warm_transitions=warm_transitions,
+                                         index=index, parsed_documents=parsed_documents, progress=progress)
+
+    successful = []
+    failed = 0
+    for triplets, transitions, filename, debug_info in results:
+        if 'error' in debug_info:
+            failed += 1
+            print(f"Error processing {filename}: {debug_info['error']}", file=sys.stderr)
+            continue
+        successful.append((triplets, transitions))
+        print(f"{filename}: {len(triplets)} triplets, {len(transitions)} transitions")
+
+    # Each output pass streams the per-file results again instead of a concatenated copy
+    suppressed = set()
+
+    def output_triplets():
+        stream = chain.from_iterable(triplets for triplets, _ in successful)
+        return (triplet for i, triplet in enumerate(stream) if i not in suppressed)
+
+    def output_transitions():
+        return chain.from_iterable(transitions for _, transitions in successful)
+
+    output_metrics = StageMetrics()
+    extra_files = None
+    if args.near_duplicates is not None:
+        from dedup_utils import NearDuplicateFilter
+
+        with output_metrics.stage('near_duplicates'):
+            near_duplicates = NearDuplicateFilter(args.near_duplicates)
+            for _ in near_duplicates.filter(output_triplets()):
+                pass
+            suppressed.update(near_duplicates.suppressed_indices())
+        extra_files = {NEAR_DUPLICATES_FILENAME: near_duplicates.report()}
+        os.makedirs(args.output_dir, exist_ok=True)
+        with open(os.path.join(args.output_dir, NEAR_DUPLICATES_FILENAME), 'w', encoding='utf-8') as f:
+            f.write(extra_files[NEAR_DUPLICATES_FILENAME])
+        print(f"Suppressed {near_duplicates.suppressed_count} near-duplicate triplets "
+              f"in {len(near_duplicates.clusters)} clusters")
+    with output_metrics.stage('output_generation'):
+        valid_examples = stream_outputs_to_dir(output_triplets(), output_transitions(), args.output_dir, memory_limit)
+    output_metrics.count('valid_examples', valid_examples)
+    print(f"Wrote outputs with {valid_examples} valid examples to {args.output_dir}")
+    if args.zip:
+        stream_outputs_to_zip(output_triplets(), output_transitions(), args.zip, memory_limit, extra_files)
+        print(f"Wrote {args.zip}")
+    if args.metrics:
+        per_file = [(filename, debug_info.get('metrics')) for _, _, filename, debug_info in results]
+        per_file.append(('(outputs)', output_metrics.as_dict()))
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(METRICS_FORMATS[args.metrics_format](per_file))
+        print(f"Wrote metrics to {args.metrics}")
+
+    if parsed_documents is not None:
+        gpt_documents = []
+        for i, (filename, data) in enumerate(documents):
+            if 'error' in results[i][3]:
+                # Already reported and counted by the rule-based pass
+                continue
+            document = parsed_documents.get(i)
+            if document is None:
+                # Files served from the extraction cache were not parsed yet
+                try:
+                    document = parse_document(data, filename)
+                except Exception as e:
+                    failed += 1
+                    print(f"Error reading {filename} for GPT: {e}", file=sys.stderr)
+                    continue
+            gpt_documents.append(document)
+    if args.gpt_batch:
+        from batch_utils import write_batch_requests
+
+        request_count = write_batch_requests(gpt_documents, args.gpt_batch, model=args.model)
+        print(f"Wrote {request_count} GPT batch requests to {args.gpt_batch}")
+    elif args.gpt:
+        gpt_examples = run_gpt_fewshots(gpt_documents, args.output_dir, args.model, args.limit,
+                                        use_cache=not args.no_gpt_cache, concurrency=args.concurrency)
+        print(f"Wrote {gpt_examples} GPT few-shot examples to {args.output_dir}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
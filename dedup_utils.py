@@ -0,0 +1,150 @@
+import hashlib
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# --- Deduplicate transition match positions ---
+def dedupe_positions(positions: Iterable[Tuple], window: int = 5) -> List[Tuple]:
+    """Drop matches starting less than `window` characters from an already kept match.
+
+    Matches are considered in the given order (the first one wins) and the kept
+    ones are returned sorted by start position. Kept starts are at least
+    `window` apart, so each bucket of width `window` holds at most one of them
+    and a match only has to be checked against its own and adjacent buckets.
+    """
+    kept = []
+    buckets: Dict[int, int] = {}
+    for pos_info in positions:
+        start = pos_info[0]
+        bucket = start // window
+        is_duplicate = False
+        for neighbour in (bucket - 1, bucket, bucket + 1):
+            existing = buckets.get(neighbour)
+            if existing is not None and abs(existing - start) < window:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            buckets[bucket] = start
+            kept.append(pos_info)
+
+    kept.sort(key=lambda x: x[0])
+    return kept
+
+# --- Deduplicate triplets ---
+def triplet_key(triplet: Dict) -> Tuple[str, str, str]:
+    return triplet['paragraph_a'], triplet['transition'], triplet['paragraph_b']
+
+def iter_unique_triplets(triplets: Iterable[Dict]) -> Iterator[Dict]:
+    """Yield the first occurrence of every (paragraph_a, transition, paragraph_b) triplet"""
+    seen = set()
+    for triplet in triplets:
+        key = triplet_key(triplet)
+        if key not in seen:
+            seen.add(key)
+            yield triplet
+
+def dedupe_triplets(triplets: Iterable[Dict]) -> List[Dict]:
+    """Remove exact duplicate triplets, keeping the first occurrence in order"""
+    return list(iter_unique_triplets(triplets))
+
+# --- Near-duplicate triplets (MinHash + LSH) ---
+WORD_RE = re.compile(r'\w+')
+
+def triplet_shingles(triplet, k: int = 3) -> Set[str]:
+    """Word k-grams of paragraph_a and paragraph_b (case and punctuation folded)"""
+    words = WORD_RE.findall(f"{triplet['paragraph_a']} {triplet['paragraph_b']}".casefold())
+    if len(words) < k:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) dividing num_perm whose S-curve threshold (1/b)^(1/r) is closest to threshold"""
+    candidates = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(candidates, key=lambda band_rows: abs((1 / band_rows[0]) ** (1 / band_rows[1]) - threshold))
+
+class NearDuplicateFilter:
+    """Corpus-level near-duplicate triplet filter using MinHash signatures and LSH banding.
+
+    Triplets are considered in order; one whose estimated Jaccard similarity
+    with an already kept triplet reaches `threshold` is suppressed and recorded
+    in that triplet's cluster. Each triplet is only compared with the kept
+    triplets sharing an LSH band, so the filter runs in roughly linear time.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        # One SHAKE-128 digest per shingle provides num_perm independent 32-bit hash values
+        self._salt = seed.to_bytes(8, 'little')
+        self._digest_size = num_perm * array('I').itemsize
+        # Band key -> indices of every kept triplet with that band value
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[array] = []
+        self._kept: List[Tuple[int, Dict]] = []
+        # Index of a kept triplet -> [(index, similarity, triplet), ...] suppressed in its favour
+        self.clusters: Dict[int, List[Tuple[int, float, Dict]]] = {}
+
+    def signature(self, triplet) -> array:
+        """MinHash signature: the minimum of each of the num_perm hash functions over the shingles"""
+        hashes = [
+            array('I', hashlib.shake_128(self._salt + shingle.encode('utf-8')).digest(self._digest_size))
+            for shingle in triplet_shingles(triplet)
+        ]
+        return array('I', map(min, zip(*hashes)))
+
+    def _similarity(self, sig_a: array, sig_b: array) -> float:
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+
+    def filter(self, triplets: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield the triplets that are not near duplicates of an earlier kept one"""
+        rows = self.rows
+        for index, triplet in enumerate(triplets):
+            sig = self.signature(triplet)
+            band_keys = [tuple(sig[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+            best, best_similarity = None, 0.0
+            candidates = set()
+            for buckets, key in zip(self._buckets, band_keys):
+                candidates.update(buckets.get(key, ()))
+            for candidate in sorted(candidates):
+                similarity = self._similarity(sig, self._signatures[candidate])
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is not None and best_similarity >= self.threshold:
+                self.clusters.setdefault(best, []).append((index, best_similarity, triplet))
+                continue
+
+            kept = len(self._signatures)
+            self._signatures.append(sig)
+            self._kept.append((index, triplet))
+            for buckets, key in zip(self._buckets, band_keys):
+                buckets.setdefault(key, []).append(kept)
+            yield triplet
+
+    @property
+    def suppressed_count(self) -> int:
+        return sum(len(members) for members in self.clusters.values())
+
+    def suppressed_indices(self) -> Set[int]:
+        """Positions, in the filtered stream, of the suppressed triplets"""
+        return {index for members in self.clusters.values() for index, _, _ in members}
+
+    def report(self) -> str:
+        """Suppressed clusters, one block per kept triplet, in corpus order"""
+        blocks = []
+        for number, kept in enumerate(sorted(self.clusters, key=lambda k: self._kept[k][0]), 1):
+            index, triplet = self._kept[kept]
+            lines = [
+                f"Cluster {number}: kept #{index}, {len(self.clusters[kept])} near duplicate(s) suppressed",
+                f"  kept: {triplet['paragraph_a']} | {triplet['transition']} | {triplet['paragraph_b']}",
+            ]
+            for member_index, similarity, member in self.clusters[kept]:
+                lines.append(
+                    f"  - #{member_index} ({similarity:.2f}): "
+                    f"{member['paragraph_a']} | {member['transition']} | {member['paragraph_b']}"
+                )
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
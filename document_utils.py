@@ -0,0 +1,66 @@
+import os
+from functools import cached_property
+from typing import List, Optional
+
+from docx_reader import iter_blocks
+from segment_utils import segment_articles
+
+_CACHED_VIEWS = ('full_text', 'clean_paragraphs', 'text_with_tables', 'segments')
+
+
+class ParsedDocument:
+    """A .docx parsed once, shared by every extractor (rule-based, GPT, transition lists).
+
+    paragraphs holds the text of every body paragraph as written, empty ones
+    included; cells the text of every top-level table cell. The derived views
+    are computed on first use and not pickled.
+    """
+
+    def __init__(self, filename: str, paragraphs: List[str], cells: List[str]):
+        self.filename = filename
+        self.paragraphs = paragraphs
+        self.cells = cells
+
+    @cached_property
+    def full_text(self) -> str:
+        """Non-empty paragraphs joined by newlines: the text the extraction pipeline segments"""
+        return "\n".join(text for text in self.paragraphs if text.strip())
+
+    @cached_property
+    def clean_paragraphs(self) -> List[str]:
+        """Stripped non-empty paragraphs"""
+        return [text.strip() for text in self.paragraphs if text.strip()]
+
+    @cached_property
+    def text_with_tables(self) -> str:
+        """Stripped non-empty paragraphs, then table cells, one per line"""
+        return '\n'.join(self.clean_paragraphs + [text.strip() for text in self.cells if text.strip()])
+
+    @cached_property
+    def segments(self):
+        """segment_articles(full_text): (marker positions, article spans)"""
+        return segment_articles(self.full_text)
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key not in _CACHED_VIEWS}
+
+
+def parse_document(source, filename: Optional[str] = None, backend: Optional[str] = None) -> ParsedDocument:
+    """Parse a .docx path, file-like object or raw bytes into a ParsedDocument"""
+    if filename is None:
+        if isinstance(source, (str, os.PathLike)):
+            filename = os.path.basename(source)
+        else:
+            filename = getattr(source, 'name', '') or ''
+    paragraphs = []
+    cells = []
+    for kind, text in iter_blocks(source, include_tables=True, backend=backend):
+        (paragraphs if kind == 'paragraph' else cells).append(text)
+    return ParsedDocument(filename, paragraphs, cells)
+
+
+def as_document(source, filename: Optional[str] = None) -> ParsedDocument:
+    """source itself if it is already parsed, otherwise parse_document(source, filename)"""
+    if isinstance(source, ParsedDocument):
+        return source
+    return parse_document(source, filename)
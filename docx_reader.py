@@ -0,0 +1,140 @@
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional, Tuple
+
+# Text-extraction backend: 'stream' parses word/document.xml incrementally,
+# 'python-docx' builds the full python-docx Document.
+DEFAULT_BACKEND = os.environ.get('TRANSITION_DOCX_BACKEND', 'stream')
+BACKENDS = ('stream', 'python-docx')
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_BODY = _W + 'body'
+_P = _W + 'p'
+_R = _W + 'r'
+_HYPERLINK = _W + 'hyperlink'
+_TBL = _W + 'tbl'
+_TC = _W + 'tc'
+_T = _W + 't'
+_TAB = _W + 'tab'
+_PTAB = _W + 'ptab'
+_BR = _W + 'br'
+_CR = _W + 'cr'
+_NO_BREAK_HYPHEN = _W + 'noBreakHyphen'
+_BR_TYPE = _W + 'type'
+
+
+def _open_zip(source) -> zipfile.ZipFile:
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+    return zipfile.ZipFile(source)
+
+
+def _run_text(run) -> str:
+    """Text of a w:r element, rendered like python-docx's Run.text"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or '')
+        elif tag in (_TAB, _PTAB):
+            parts.append('\t')
+        elif tag == _BR:
+            if child.get(_BR_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == _CR:
+            parts.append('\n')
+        elif tag == _NO_BREAK_HYPHEN:
+            parts.append('-')
+    return ''.join(parts)
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of a w:p element: its runs, including runs inside hyperlinks"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child if run.tag == _R)
+    return ''.join(parts)
+
+
+def _iter_blocks_stream(source, include_tables: bool) -> Iterator[Tuple[str, str]]:
+    """Stream body paragraphs (and top-level table cells) out of word/document.xml.
+
+    Every direct child of w:body is discarded as soon as it has been read, so
+    memory stays bounded by the largest single paragraph or table.
+    """
+    with _open_zip(source) as archive, archive.open('word/document.xml') as xml_file:
+        stack = []
+        body = None
+        table_depth = 0
+        cell_paragraphs: List[str] = []
+
+        for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                stack.append(tag)
+                if tag == _BODY:
+                    body = elem
+                elif tag == _TBL:
+                    table_depth += 1
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+
+            if tag == _P:
+                if parent == _BODY:
+                    yield 'paragraph', _paragraph_text(elem)
+                elif include_tables and parent == _TC and table_depth == 1:
+                    cell_paragraphs.append(_paragraph_text(elem))
+            elif tag == _TC and table_depth == 1:
+                if include_tables:
+                    yield 'cell', '\n'.join(cell_paragraphs)
+                cell_paragraphs = []
+            elif tag == _TBL:
+                table_depth -= 1
+
+            if parent == _BODY:
+                body.clear()
+
+
+def _iter_blocks_python_docx(source, include_tables: bool) -> Iterator[Tuple[str, str]]:
+    from docx import Document
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    doc = Document(source)
+    for paragraph in doc.paragraphs:
+        yield 'paragraph', paragraph.text
+    if include_tables:
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    yield 'cell', cell.text
+
+
+def iter_blocks(source, include_tables: bool = False, backend: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Yield ('paragraph', text) for every body paragraph and, with include_tables, ('cell', text) for table cells.
+
+    source is a path, a file-like object or the raw .docx bytes. The stream
+    backend yields blocks in document order and each merged table cell once;
+    python-docx yields all paragraphs before the tables.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'stream':
+        return _iter_blocks_stream(source, include_tables)
+    if backend == 'python-docx':
+        return _iter_blocks_python_docx(source, include_tables)
+    raise ValueError(f"Unknown docx backend {backend!r}, expected one of {BACKENDS}")
+
+
+def iter_paragraphs(source, backend: Optional[str] = None) -> Iterator[str]:
+    """Yield the text of every body paragraph, like [p.text for p in Document(source).paragraphs]"""
+    for _, text in iter_blocks(source, backend=backend):
+        yield text
@@ -1,15 +1,15 @@
 # --- FILE: extract_fewshots.py ---
 import json
-from docx import Document
+from document_utils import as_document
 from typing import List, Tuple
 from validator_utils import build_fewshots_with_gpt
 
 TRANSITION_MARKER = "À savoir également dans votre département"
 TRANSITION_LIST_MARKER = "Transitions :"
 
-def clean_paragraphs(path: str) -> List[str]:
-    doc = Document(path)
-    return [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+def clean_paragraphs(source) -> List[str]:
+    """Stripped non-empty paragraphs of a .docx path or ParsedDocument"""
+    return as_document(source).clean_paragraphs
 
 def extract_section_after_marker(paragraphs: List[str], marker: str) -> List[str]:
     for i, p in enumerate(paragraphs):
@@ -26,28 +26,21 @@ def extract_transitions_used(paragraphs: List[str]) -> List[str]:
 def extract_long_paragraphs(paragraphs: List[str]) -> List[str]:
     return [p for p in paragraphs if len(p.split()) > 100]
 
-def extract_few_shot_examples_and_jsonl(doc_path, use_gpt=True, model="gpt-4", limit=None) -> Tuple[str, str]:
+def extract_gpt_inputs(doc_path) -> Tuple[List[str], List[str]]:
+    """Return (transitions, long paragraphs) sent to GPT for a document, or two empty lists
+
+    doc_path is a .docx path or a ParsedDocument already used by another extractor.
+    """
     paragraphs = clean_paragraphs(doc_path)
     section = extract_section_after_marker(paragraphs, TRANSITION_MARKER)
     transitions = extract_transitions_used(paragraphs)
 
     if not section or not transitions:
-        return json.dumps([], indent=2), ""
-
-    long_paragraphs = extract_long_paragraphs(section)
-    all_results = []
-
-    for para in long_paragraphs:
-        if use_gpt:
-            fewshots = build_fewshots_with_gpt(para, transitions, model=model)
-        else:
-            continue  # fallback logic not implemented in this mode
-
-        all_results.extend(fewshots)
-        if limit and len(all_results) >= limit:
-            all_results = all_results[:limit]
-            break
+        return [], []
+    return transitions, extract_long_paragraphs(section)
 
+def format_few_shot_outputs(all_results: List[dict]) -> Tuple[str, str]:
+    """Render GPT few-shot examples as (JSON array, fine-tuning JSONL)"""
     jsonl_lines = []
     for ex in all_results:
         jsonl_lines.append(json.dumps({
@@ -59,3 +52,51 @@ def extract_few_shot_examples_and_jsonl(doc_path, use_gpt=True, model="gpt-4", l
         }, ensure_ascii=False))
 
     return json.dumps(all_results, indent=2, ensure_ascii=False), "\n".join(jsonl_lines)
+
+def combine_few_shot_outputs(per_document_outputs) -> Tuple[str, str, int]:
+    """Merge per-document (fewshot_json, fewshot_jsonl) pairs into one (JSON array, JSONL, example count)"""
+    all_examples = []
+    jsonl_parts = []
+    for fewshot_json, fewshot_jsonl in per_document_outputs:
+        all_examples.extend(json.loads(fewshot_json))
+        if fewshot_jsonl:
+            jsonl_parts.append(fewshot_jsonl)
+    return json.dumps(all_examples, indent=2, ensure_ascii=False), "\n".join(jsonl_parts), len(all_examples)
+
+def extract_few_shot_examples_and_jsonl(doc_path, use_gpt=True, model="gpt-4", limit=None,
+                                        concurrency=1, use_cache=True, api_key=None) -> Tuple[str, str]:
+    transitions, long_paragraphs = extract_gpt_inputs(doc_path)
+
+    if not transitions:
+        return json.dumps([], indent=2), ""
+
+    all_results = []
+
+    if use_gpt and concurrency > 1:
+        from gpt_async import build_fewshots_concurrently  # asyncio is only imported when needed
+
+        # Paragraphs go out concurrently, results come back in paragraph order.
+        # With a limit they go in chunks no larger than the examples still
+        # needed (a paragraph yields at least one at best), so nothing is paid
+        # for past the limit.
+        position = 0
+        while position < len(long_paragraphs) and not (limit and len(all_results) >= limit):
+            chunk_size = min(concurrency, limit - len(all_results)) if limit else len(long_paragraphs)
+            chunk = long_paragraphs[position:position + chunk_size]
+            position += len(chunk)
+            for fewshots in build_fewshots_concurrently(chunk, transitions, model=model,
+                                                        max_concurrency=concurrency, use_cache=use_cache,
+                                                        api_key=api_key):
+                all_results.extend(fewshots)
+    elif use_gpt:
+        for para in long_paragraphs:
+            all_results.extend(build_fewshots_with_gpt(para, transitions, model=model, use_cache=use_cache,
+                                                       api_key=api_key))
+            if limit and len(all_results) >= limit:
+                break
+    # Without GPT: fallback logic not implemented in this mode
+
+    if limit:
+        all_results = all_results[:limit]
+
+    return format_few_shot_outputs(all_results)
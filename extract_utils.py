@@ -1,17 +1,15 @@
 # --- FILE: extract_utils.py ---
-import docx
-import io
+from document_utils import as_document
 import re
 from collections import Counter
 
 # --- Extract transitions from DOCX ---
 def extract_transitions_from_docx(docx_bytes):
-    doc = docx.Document(io.BytesIO(docx_bytes))
     transitions_raw = []
     capture = False
 
-    for para in doc.paragraphs:
-        text = para.text.strip()
+    for para_text in as_document(docx_bytes).paragraphs:
+        text = para_text.strip()
         if "transitions" in text.lower():
             capture = True
             continue
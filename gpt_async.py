@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import List, Optional
+
+from prompt_utils import FEWSHOT_TEMPERATURE, build_fewshot_prompt, parse_fewshot_output
+from cache_utils import PromptCache, default_prompt_cache
+from validator_utils import resolve_api_key, store_completion
+
+logger = logging.getLogger(__name__)
+
+# Rough completion size reserved per request when budgeting tokens per minute
+COMPLETION_TOKENS_ESTIMATE = 1024
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Cheap token estimate (about 4 characters per token) plus the expected completion"""
+    return len(prompt) // 4 + COMPLETION_TOKENS_ESTIMATE
+
+
+class AsyncRateLimiter:
+    """Sliding-window limiter on requests and tokens per minute (None disables a limit)"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 period: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.period:
+                    self._tokens_in_window -= self._events.popleft()[1]
+
+                requests_ok = self.requests_per_minute is None or len(self._events) < self.requests_per_minute
+                # A request larger than the whole budget is let through once the window is empty
+                tokens_ok = (self.tokens_per_minute is None or not self._events
+                             or self._tokens_in_window + tokens <= self.tokens_per_minute)
+                if requests_ok and tokens_ok:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+
+                await asyncio.sleep(max(self._events[0][0] + self.period - now, 0.01))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429 and 5xx responses, connection errors and timeouts are worth retrying"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    if any(cls.__name__ == 'APIConnectionError' for cls in type(error).__mro__):
+        return True
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+def _retry_delay(error: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """Server-provided Retry-After if any, else exponential backoff with jitter"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        retry_after = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, max_delay)
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay * (0.5 + random.random() / 2)
+
+
+async def build_fewshots_with_gpt_async(paragraphs: List[str], transitions: list, model="gpt-4", *,
+                                        client=None, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                                        max_concurrency: int = 5, requests_per_minute: Optional[int] = None,
+                                        tokens_per_minute: Optional[int] = None, max_retries: int = 5,
+                                        base_delay: float = 1.0, max_delay: float = 60.0,
+                                        use_cache: bool = True, cache: Optional[PromptCache] = None) -> List[list]:
+    """Async variant of build_fewshots_with_gpt over many paragraphs.
+
+    Returns one list of few-shot examples per paragraph, in input order. At
+    most max_concurrency requests are in flight; 429/5xx responses and
+    connection errors are retried with exponential backoff. A paragraph that
+    still fails yields an empty list. base_url points the client at any
+    OpenAI-compatible server, e.g. a local stub in tests. Cached prompts
+    (see PromptCache) are answered without a request unless use_cache is False.
+    """
+    if use_cache:
+        cache = cache or default_prompt_cache()
+    prompts = [build_fewshot_prompt(paragraph, transitions) for paragraph in paragraphs]
+    results: List[Optional[list]] = [None] * len(prompts)
+    if use_cache:
+        for i, prompt in enumerate(prompts):
+            cached = cache.get(model, FEWSHOT_TEMPERATURE, prompt)
+            if cached is not None:
+                results[i] = cached[1]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    owns_client = client is None
+    if owns_client:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=resolve_api_key(api_key), base_url=base_url, max_retries=0)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = AsyncRateLimiter(requests_per_minute, tokens_per_minute)
+
+    async def request_once(prompt: str) -> str:
+        async with semaphore:
+            await limiter.acquire(estimate_tokens(prompt))
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=FEWSHOT_TEMPERATURE,
+            )
+        return response.choices[0].message.content.strip()
+
+    async def build_one(prompt: str) -> list:
+        for attempt in range(max_retries + 1):
+            try:
+                output = await request_once(prompt)
+                parsed = parse_fewshot_output(output, strict=True)
+            except Exception as e:
+                if attempt < max_retries and _is_retryable(e):
+                    # Back off outside the semaphore so a long Retry-After does not hold a slot
+                    await asyncio.sleep(_retry_delay(e, attempt, base_delay, max_delay))
+                    continue
+                logger.warning("GPT few-shot builder failed: %s", e)
+                return []
+            if use_cache:
+                store_completion(cache, model, prompt, output, parsed)
+            return parsed
+        return []
+
+    try:
+        fresh = await asyncio.gather(*(build_one(prompts[i]) for i in pending))
+        for i, result in zip(pending, fresh):
+            results[i] = result
+        return results
+    finally:
+        if owns_client:
+            await client.close()
+
+
+def build_fewshots_concurrently(paragraphs: List[str], transitions: list, model="gpt-4", **kwargs) -> List[list]:
+    """Blocking wrapper around build_fewshots_with_gpt_async for synchronous callers"""
+    return asyncio.run(build_fewshots_with_gpt_async(paragraphs, transitions, model=model, **kwargs))
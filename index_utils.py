@@ -0,0 +1,260 @@
+"""Persistent inverted index of transition occurrences across the corpus.
+
+    python index_utils.py INDEX counts
+    python index_utils.py INDEX sample "Par ailleurs" -n 5
+    python index_utils.py INDEX outputs OUTPUT_DIR
+
+Every indexed document is identified by the SHA-256 of its bytes and stored
+with the extractor version that produced its rows; each of its triplets is
+stored with the article index and the offsets of the transition in the
+document text. Output files can be regenerated from the index alone; only
+documents of the current extractor version are replayed or counted.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from cache_utils import content_hash, extractor_version
+from triplet_utils import triplet_span
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    'TRANSITION_INDEX_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'transition_processor', 'index.sqlite3')
+)
+# Rows fetched per lock acquisition when iterating the whole index
+ITER_BATCH_SIZE = 1000
+
+
+class TransitionIndex:
+    """SQLite index mapping each transition to its occurrences in the processed documents.
+
+    Documents keep the order in which they were first indexed, so iterating the
+    index replays the corpus in that order. Re-indexing a document replaces
+    its rows in place; documents indexed by another extractor version count as
+    not indexed, so add_results re-indexes them. Until then their rows are kept
+    (with their place in the corpus order) but every query and replay skips
+    them, so outputs never mix versions. As with the caches of
+    cache_utils, one instance may be shared by threads: its connection is
+    only used under a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, version: Optional[str] = None):
+        self.path = path
+        self.version = version or extractor_version()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " digest TEXT PRIMARY KEY,"
+            " seq INTEGER NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " version TEXT NOT NULL DEFAULT '',"
+            " indexed_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS occurrences ("
+            " digest TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " article INTEGER NOT NULL,"
+            " start INTEGER NOT NULL,"
+            " end INTEGER NOT NULL,"
+            " transition TEXT NOT NULL,"
+            " paragraph_a TEXT NOT NULL,"
+            " paragraph_b TEXT NOT NULL,"
+            " PRIMARY KEY (digest, position));"
+            "CREATE INDEX IF NOT EXISTS occurrences_transition ON occurrences (transition);"
+            "CREATE TABLE IF NOT EXISTS transition_lines ("
+            " digest TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " transition TEXT NOT NULL,"
+            " PRIMARY KEY (digest, position));"
+            "CREATE INDEX IF NOT EXISTS transition_lines_transition ON transition_lines (transition);"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if 'version' not in columns:
+            # Index created before versions were stored: its documents match no version
+            with self._conn:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN version TEXT NOT NULL DEFAULT ''")
+
+    # --- Updates ---
+    def has_document(self, digest: str) -> bool:
+        """Whether the document is indexed with the current extractor version"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM documents WHERE digest = ? AND version = ?", (digest, self.version)
+            ).fetchone() is not None
+
+    def add_document(self, digest: str, filename: str, triplets: List[Dict], transitions: List[str]):
+        """Index (or re-index) one extract_document result; spans come from the Triplet records"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT seq FROM documents WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                seq = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM documents").fetchone()[0]
+            else:
+                seq = row[0]
+                self._delete_rows(digest)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (digest, seq, filename, version, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, seq, filename, self.version, time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO occurrences (digest, position, article, start, end, transition, paragraph_a, paragraph_b)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (digest, position, *triplet_span(triplet),
+                     triplet['transition'], triplet['paragraph_a'], triplet['paragraph_b'])
+                    for position, triplet in enumerate(triplets)
+                )
+            )
+            self._conn.executemany(
+                "INSERT INTO transition_lines (digest, position, transition) VALUES (?, ?, ?)",
+                ((digest, position, transition) for position, transition in enumerate(transitions))
+            )
+
+    def add_results(self, documents, results) -> int:
+        """Index the successful results of process_documents_parallel not indexed yet, or indexed by
+        another extractor version; returns how many were (re-)indexed"""
+        added = 0
+        for (filename, data), (triplets, transitions, _, debug_info) in zip(documents, results):
+            digest = content_hash(data)
+            if 'error' in debug_info or self.has_document(digest):
+                continue
+            self.add_document(digest, filename, triplets, transitions)
+            added += 1
+        return added
+
+    def remove_document(self, digest: str):
+        with self._lock, self._conn:
+            self._delete_rows(digest)
+            self._conn.execute("DELETE FROM documents WHERE digest = ?", (digest,))
+
+    def _delete_rows(self, digest: str):
+        self._conn.execute("DELETE FROM occurrences WHERE digest = ?", (digest,))
+        self._conn.execute("DELETE FROM transition_lines WHERE digest = ?", (digest,))
+
+    # --- Queries ---
+    def document_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE version = ?", (self.version,)
+            ).fetchone()[0]
+
+    def triplet_counts(self) -> Counter:
+        """Number of triplets per transition"""
+        with self._lock:
+            return Counter(dict(self._conn.execute(
+                "SELECT o.transition, COUNT(*) FROM occurrences o JOIN documents d ON d.digest = o.digest"
+                " WHERE d.version = ? GROUP BY o.transition", (self.version,)
+            ).fetchall()))
+
+    def transition_line_counts(self) -> Counter:
+        """Number of "Transitions :" lines per transition"""
+        with self._lock:
+            return Counter(dict(self._conn.execute(
+                "SELECT t.transition, COUNT(*) FROM transition_lines t JOIN documents d ON d.digest = t.digest"
+                " WHERE d.version = ? GROUP BY t.transition", (self.version,)
+            ).fetchall()))
+
+    def occurrences(self, transition: str, limit: Optional[int] = None, random_order: bool = False) -> List[Dict]:
+        """Occurrences of a transition, in corpus order or as a random sample"""
+        order = "RANDOM()" if random_order else "d.seq, o.position"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.filename, o.digest, o.article, o.start, o.end, o.paragraph_a, o.transition, o.paragraph_b"
+                " FROM occurrences o JOIN documents d ON d.digest = o.digest"
+                f" WHERE o.transition = ? AND d.version = ? ORDER BY {order} LIMIT ?",
+                (transition, self.version, -1 if limit is None else limit)
+            ).fetchall()
+        return [
+            {
+                'filename': filename, 'digest': digest, 'article': article, 'start': start, 'end': end,
+                'triplet': {'paragraph_a': paragraph_a, 'transition': transition, 'paragraph_b': paragraph_b},
+            }
+            for filename, digest, article, start, end, paragraph_a, transition, paragraph_b in rows
+        ]
+
+    def sample(self, transition: str, k: int = 3) -> List[Dict]:
+        return self.occurrences(transition, limit=k, random_order=True)
+
+    def iter_triplets(self) -> Iterator[Dict]:
+        """Every indexed triplet in corpus order"""
+        for paragraph_a, transition, paragraph_b in self._iter_rows(
+                "SELECT o.paragraph_a, o.transition, o.paragraph_b"
+                " FROM occurrences o JOIN documents d ON d.digest = o.digest"
+                " WHERE d.version = ? ORDER BY d.seq, o.position", (self.version,)):
+            yield {'paragraph_a': paragraph_a, 'transition': transition, 'paragraph_b': paragraph_b}
+
+    def iter_transitions(self) -> Iterator[str]:
+        """Every indexed "Transitions :" line in corpus order"""
+        for (transition,) in self._iter_rows(
+                "SELECT t.transition FROM transition_lines t JOIN documents d ON d.digest = t.digest"
+                " WHERE d.version = ? ORDER BY d.seq, t.position", (self.version,)):
+            yield transition
+
+    def _iter_rows(self, query: str, parameters: tuple = ()) -> Iterator[tuple]:
+        """Stream the rows of a query, taking the lock per batch rather than across yields"""
+        with self._lock:
+            cursor = self._conn.execute(query, parameters)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(ITER_BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def write_outputs(self, output_dir: str, memory_limit: Optional[int] = None) -> int:
+        """Regenerate the six output files from the current-version documents; returns the number of valid examples"""
+        from output_utils import stream_outputs_to_dir
+
+        return stream_outputs_to_dir(self.iter_triplets(), self.iter_transitions(), output_dir, memory_limit)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM occurrences")
+            self._conn.execute("DELETE FROM transition_lines")
+            self._conn.execute("DELETE FROM documents")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the transition occurrence index")
+    parser.add_argument('index', help="index database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    counts = commands.add_parser('counts', help="triplets and transition lines per transition")
+    counts.add_argument('--min', type=int, default=1, help="only transitions with at least this many triplets")
+    sample = commands.add_parser('sample', help="random occurrences of a transition")
+    sample.add_argument('transition')
+    sample.add_argument('-n', type=int, default=3)
+    outputs = commands.add_parser('outputs', help="regenerate the output files from the index")
+    outputs.add_argument('output_dir')
+    args = parser.parse_args(argv)
+
+    index = TransitionIndex(args.index)
+    if args.command == 'counts':
+        line_counts = index.transition_line_counts()
+        for transition, count in index.triplet_counts().most_common():
+            if count >= args.min:
+                print(f"{count}\t{line_counts[transition]}\t{transition}")
+    elif args.command == 'sample':
+        for occurrence in index.sample(args.transition, args.n):
+            print(json.dumps(occurrence, ensure_ascii=False))
+    else:
+        valid_examples = index.write_outputs(args.output_dir)
+        print(f"Wrote outputs with {valid_examples} valid examples from {index.document_count()} documents "
+              f"to {args.output_dir}")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Dict, List, Tuple
+
+# --- Multi-pattern transition matcher (Aho-Corasick) ---
+class TransitionMatcher:
+    """Match every variation of every transition of an article in one pass over the text.
+
+    Matching is case-insensitive in the same way as the original per-variation
+    ``str.find`` loop: the pattern is ``variation.lower().strip()`` searched in
+    ``text.lower()``, and a hit spans ``len(variation)`` characters.
+    """
+
+    def __init__(self, transitions: List[str], variations: List[List[str]]):
+        self.transitions = list(transitions)
+        # Trie / automaton state tables
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Each output is (pattern length, transition index, variation index, variation length)
+        self._out: List[List[Tuple[int, int, int, int]]] = [[]]
+
+        for t_idx, transition_variations in enumerate(variations):
+            for v_idx, variation in enumerate(transition_variations):
+                if not variation.strip():
+                    continue
+                pattern = variation.lower().strip()
+                self._add_pattern(pattern, (len(pattern), t_idx, v_idx, len(variation)))
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, output: Tuple[int, int, int, int]):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit the outputs of the longest proper suffix
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def _scan(self, text_lower: str):
+        """Yield (start, transition index, variation index, variation length) for every hit"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, char in enumerate(text_lower):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_len, t_idx, v_idx, var_len in out[state]:
+                yield i - pattern_len + 1, t_idx, v_idx, var_len
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """Return every (start, end, canonical transition) hit in text order"""
+        hits = [
+            (start, start + var_len, self.transitions[t_idx])
+            for start, t_idx, _, var_len in self._scan(text.lower())
+        ]
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def positions_by_transition(self, text: str) -> List[List[Tuple[int, int, str, str]]]:
+        """Group hits per transition as (start, end, actual_text, transition) tuples.
+
+        Hits are ordered by variation then position, which is the order the
+        per-variation search used to produce them in.
+        """
+        grouped: List[List[Tuple[int, int, int]]] = [[] for _ in self.transitions]
+        for start, t_idx, v_idx, var_len in self._scan(text.lower()):
+            grouped[t_idx].append((v_idx, start, var_len))
+
+        positions = []
+        for t_idx, hits in enumerate(grouped):
+            hits.sort()
+            transition = self.transitions[t_idx]
+            positions.append([
+                (start, start + var_len, text[start:start + var_len], transition)
+                for _, start, var_len in hits
+            ])
+        return positions
+
+    def positions_in_view(self, view, suffixes: List[str]) -> List[List[Tuple[int, int, str, str]]]:
+        """positions_by_transition over a NormalizedText, for a matcher built with one needle per transition.
+
+        Hits are found in ``view.text`` and mapped back to offsets in
+        ``view.original``, ordered by position. A hit is extended over the
+        transition's suffix (its trailing punctuation) when the original text
+        has it right after the match.
+        """
+        original = view.original
+        grouped: List[List[Tuple[int, int]]] = [[] for _ in self.transitions]
+        for start, t_idx, _, pattern_len in self._scan(view.text):
+            grouped[t_idx].append(view.span(start, start + pattern_len))
+
+        positions = []
+        for t_idx, hits in enumerate(grouped):
+            hits.sort()
+            transition = self.transitions[t_idx]
+            suffix = suffixes[t_idx]
+            transition_positions = []
+            for start, end in hits:
+                if suffix and original.startswith(suffix, end):
+                    end += len(suffix)
+                transition_positions.append((start, end, original[start:end], transition))
+            positions.append(transition_positions)
+        return positions
@@ -0,0 +1,133 @@
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Tuple
+
+# Pipeline stages in the order they run, used to order reports
+STAGES = (
+    'docx_load',
+    'marker_scan',
+    'transition_parsing',
+    'normalization',
+    'matching',
+    'context_extraction',
+    'output_generation',
+)
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.seconds[self.name] += time.perf_counter() - self.start
+        self.metrics.calls[self.name] += 1
+        return False
+
+
+class StageMetrics:
+    """Wall time and call count per pipeline stage, plus free-form counters"""
+
+    enabled = True
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.counters = Counter()
+
+    def stage(self, name: str):
+        """Context manager timing one call of a stage"""
+        return _StageTimer(self, name)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def as_dict(self) -> Dict:
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return {
+            'stages': {
+                name: {'seconds': self.seconds[name], 'calls': self.calls[name]}
+                for name in sorted(self.calls, key=lambda name: (order.get(name, len(order)), name))
+            },
+            'counters': dict(self.counters),
+        }
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullMetrics:
+    """Disabled metrics: every call is a no-op on shared objects"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def as_dict(self) -> Dict:
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+
+
+# --- Export ---
+def metrics_to_json(per_file: Iterable[Tuple[str, Dict]]) -> str:
+    """JSON object mapping each file name to its metrics dict"""
+    return json.dumps({filename: metrics for filename, metrics in per_file if metrics}, indent=2, ensure_ascii=False)
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_to_prometheus(per_file: Iterable[Tuple[str, Dict]]) -> str:
+    """Prometheus text exposition format of per-file stage timings and counters"""
+    seconds_lines = []
+    calls_lines = []
+    counter_lines = []
+    for filename, metrics in per_file:
+        if not metrics:
+            continue
+        file_label = _label(filename)
+        for stage, values in metrics.get('stages', {}).items():
+            labels = f'file="{file_label}",stage="{_label(stage)}"'
+            seconds_lines.append(f"transition_stage_seconds_total{{{labels}}} {values['seconds']:.6f}")
+            calls_lines.append(f"transition_stage_calls_total{{{labels}}} {values['calls']}")
+        for name, value in metrics.get('counters', {}).items():
+            counter_lines.append(f'transition_items_total{{file="{file_label}",item="{_label(name)}"}} {value}')
+
+    lines = [
+        "# HELP transition_stage_seconds_total Wall time spent in each extraction stage.",
+        "# TYPE transition_stage_seconds_total counter",
+        *seconds_lines,
+        "# HELP transition_stage_calls_total Number of calls of each extraction stage.",
+        "# TYPE transition_stage_calls_total counter",
+        *calls_lines,
+        "# HELP transition_items_total Items seen by the extraction pipeline.",
+        "# TYPE transition_items_total counter",
+        *counter_lines,
+    ]
+    return "\n".join(lines) + "\n"
+
+
+METRICS_FORMATS = {'json': metrics_to_json, 'prometheus': metrics_to_prometheus}
@@ -0,0 +1,113 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+# Apostrophe look-alikes found in Word documents, all read as "'"
+APOSTROPHES = "’‘ʼ`´′"
+# Punctuation a transition may end with but that the text may omit
+TRAILING_PUNCTUATION = '.,!?;:'
+
+# One-for-one rewrites: other horizontal whitespace (tabs, non-breaking
+# spaces...) to a space, apostrophe look-alikes to "'". Line breaks are kept:
+# they separate the document's paragraphs, which a transition never spans.
+REPLACEMENTS = {
+    **{chr(code): ' ' for code in range(0x3001)
+       if chr(code).isspace() and code != 0x20 and len(f'a{chr(code)}a'.splitlines()) == 1},
+    **{char: "'" for char in APOSTROPHES},
+}
+# Rewrites that change the length, found after the replacements: an elided
+# "qu'" reads as "que ", and space runs collapse to one space. Both patterns
+# start with literals so the scan stays fast on ordinary text.
+QU_ELISION_RE = re.compile(r"qu' *")
+SPACE_RUN_RE = re.compile(r"   *")
+
+
+def _fold_char(char: str) -> str:
+    folded = char.casefold()
+    return folded if len(folded) == 1 else char
+
+
+class NormalizedText:
+    """Case-folded view of a text with canonical apostrophes, "qu'" and whitespace.
+
+    The offset map is sparse: ``original_offset(i) == i + delta`` where delta
+    is that of the last breakpoint at or before view position i. Breakpoints
+    only occur after a rewrite that changes the length, so ordinary text
+    costs nothing. A match ``[i, j)`` in the view covers
+    ``original[original_offset(i):original_offset(j)]``.
+    """
+
+    __slots__ = ('original', 'text', '_breakpoints', '_deltas')
+
+    def __init__(self, original: str):
+        folded = original.casefold()
+        if len(folded) != len(original):
+            # Keep one character per character: those folding to several (e.g. "ß") stay as they are
+            folded = ''.join(map(_fold_char, original))
+        # str.replace per character present beats str.translate on non-ASCII text
+        for char in REPLACEMENTS.keys() & set(folded):
+            folded = folded.replace(char, REPLACEMENTS[char])
+
+        rewrites = [
+            (match.start(), match.end(), 'que ')
+            for match in QU_ELISION_RE.finditer(folded)
+            if match.start() == 0 or not _is_word_char(folded[match.start() - 1])
+        ]
+        rewrites.extend((match.start(), match.end(), ' ') for match in SPACE_RUN_RE.finditer(folded))
+        rewrites.sort()
+
+        pieces = []
+        breakpoints = array('q', [0])
+        deltas = array('q', [0])
+        length = 0
+        position = 0
+        for start, end, replacement in rewrites:
+            if start < position:
+                # Spaces already consumed by the "qu'" before them
+                continue
+            pieces.append(folded[position:start])
+            pieces.append(replacement)
+            length += start - position + len(replacement)
+            # The replacement maps onto original[start:], what follows it onto original[end:]
+            breakpoints.append(length)
+            deltas.append(end - length)
+            position = end
+        pieces.append(folded[position:])
+
+        self.original = original
+        self.text = ''.join(pieces)
+        self._breakpoints = breakpoints
+        self._deltas = deltas
+
+    def original_offset(self, position: int) -> int:
+        """Offset in the original text of view position (0 <= position <= len(text))"""
+        return position + self._deltas[bisect_right(self._breakpoints, position) - 1]
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Offsets in the original text of the view slice [start, end)"""
+        return self.original_offset(start), self.original_offset(end)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def normalize(text: str) -> str:
+    """Normalized form of a short string, as it appears in a NormalizedText view"""
+    return NormalizedText(text).text.strip()
+
+
+def transition_needle(transition: str) -> Tuple[str, str]:
+    """(needle, suffix) of a transition.
+
+    The needle is the normalized transition without its trailing punctuation;
+    the suffix is that punctuation as written, to be included in a match when
+    the text has it too.
+    """
+    base = transition.rstrip(TRAILING_PUNCTUATION)
+    needle = normalize(base)
+    if not needle:
+        # Nothing but punctuation: match it as is
+        return normalize(transition), ''
+    return needle, transition[len(base.rstrip()):]
@@ -0,0 +1,201 @@
+import json
+import os
+import zipfile
+import io
+import tempfile
+import contextlib
+from collections import Counter
+from triplet_utils import triplet_dict, triplet_dicts
+from spill_utils import ExternalSorter, SpillingCounter
+
+# File names of the six output artifacts, in the order generate_outputs returns them
+OUTPUT_FILENAMES = (
+    'fewshot_examples.json',
+    'transitions_only.txt',
+    'fewshot_examples.jsonl',
+    'fewshots_rejected.txt',
+    'transitions_only_rejected.txt',
+    'fewshots-fineTuning_rejected.txt',
+)
+# Report of the optional near-duplicate filter (dedup_utils.NearDuplicateFilter)
+NEAR_DUPLICATES_FILENAME = 'near_duplicates_rejected.txt'
+
+def fewshot_example(triplet):
+    """Chat fine-tuning example of one triplet, as written to fewshot_examples.jsonl"""
+    return {
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that continues text based on the given context."
+            },
+            {
+                "role": "user",
+                "content": f"{triplet['paragraph_a']} {triplet['transition']}"
+            },
+            {
+                "role": "assistant",
+                "content": triplet['paragraph_b']
+            }
+        ]
+    }
+
+def generate_outputs(all_triplets, all_transitions):
+    """Generate various output formats from the extracted data."""
+    # Count transition occurrences
+    transition_counts = Counter([t['transition'] for t in all_triplets])
+    
+    # Cap each transition at 3 uses
+    capped_triplets = []
+    transition_usage = Counter()
+    
+    for triplet in all_triplets:
+        transition = triplet['transition']
+        if transition_usage[transition] < 3:
+            capped_triplets.append(triplet)
+            transition_usage[transition] += 1
+    
+    # 1. fewshot_examples.json
+    fewshot_json = json.dumps(triplet_dicts(capped_triplets), indent=2, ensure_ascii=False)
+    
+    # 2. fewshots_rejected.txt
+    rejected_transitions = []
+    for transition, count in transition_counts.items():
+        if count > 3:
+            rejected_transitions.append(f"{transition}: {count}")
+    fewshots_rejected_txt = "\n".join(rejected_transitions)
+    
+    # 3. transitions_only.txt
+    transitions_txt = "\n".join(sorted(set(all_transitions)))
+    
+    # 4. transitions_only_rejected.txt
+    transition_counts_all = Counter(all_transitions)
+    transitions_rejected = []
+    for transition, count in transition_counts_all.items():
+        if count > 1:
+            transitions_rejected.append(f"{transition}: {count}")
+    transitions_only_rejected_txt = "\n".join(transitions_rejected)
+    
+    # 5. fewshot_examples.jsonl
+    jsonl_examples = []
+    for triplet in capped_triplets:
+        jsonl_examples.append(json.dumps(fewshot_example(triplet), ensure_ascii=False))
+    
+    fewshot_jsonl = "\n".join(jsonl_examples)
+    
+    # 6. fewshots-fineTuning_rejected.txt
+    finetuning_rejected = []
+    for transition, count in transition_counts.items():
+        if count > 3:
+            finetuning_rejected.append(f"{transition}: {count}")
+    fewshots_finetuning_rejected_txt = "\n".join(finetuning_rejected)
+    
+    return (
+        fewshot_json, 
+        transitions_txt, 
+        fewshot_jsonl, 
+        fewshots_rejected_txt,
+        transitions_only_rejected_txt,
+        fewshots_finetuning_rejected_txt,
+        len(capped_triplets)
+    )
+
+def create_download_zip(fewshot_json, transitions_txt, fewshot_jsonl, 
+                       fewshots_rejected_txt, transitions_only_rejected_txt, 
+                       fewshots_finetuning_rejected_txt, extra_files=None):
+    """Create a ZIP file containing all output files (plus optional {filename: content} extras)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        zip_file.writestr('fewshot_examples.json', fewshot_json)
+        zip_file.writestr('transitions_only.txt', transitions_txt)
+        zip_file.writestr('fewshot_examples.jsonl', fewshot_jsonl)
+        zip_file.writestr('fewshots_rejected.txt', fewshots_rejected_txt)
+        zip_file.writestr('transitions_only_rejected.txt', transitions_only_rejected_txt)
+        zip_file.writestr('fewshots-fineTuning_rejected.txt', fewshots_finetuning_rejected_txt)
+        for filename, content in (extra_files or {}).items():
+            zip_file.writestr(filename, content)
+    
+    buffer.seek(0)
+    return buffer.getvalue()
+
+def stream_outputs_to_dir(triplets, transitions, output_dir, memory_limit=None):
+    """Write the six output files into output_dir while consuming the triplets as a stream.
+
+    Produces the same bytes as generate_outputs, but the JSON array and JSONL
+    files are written one capped triplet at a time; only per-transition
+    counters are kept in memory. Returns the number of valid examples.
+
+    With memory_limit (bytes), triplets and transitions may be any iterables:
+    the counters spill to disk and transitions_only.txt is produced by an
+    external merge sort, keeping the aggregation state under the limit.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = dict(zip(OUTPUT_FILENAMES, (os.path.join(output_dir, name) for name in OUTPUT_FILENAMES)))
+
+    with contextlib.ExitStack() as stack:
+        work_dir = None
+        part_limit = None
+        if memory_limit is not None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='transition_outputs_'))
+            part_limit = memory_limit // 3
+        transition_counts = SpillingCounter(work_dir, part_limit, 'triplet_counts')
+        transition_counts_all = SpillingCounter(work_dir, part_limit, 'transition_counts')
+        unique_transitions = ExternalSorter(work_dir, part_limit, 'transitions')
+        stack.callback(transition_counts.close)
+        stack.callback(transition_counts_all.close)
+
+        valid_examples = 0
+        with open(paths['fewshot_examples.json'], 'w', encoding='utf-8') as json_file, \
+                open(paths['fewshot_examples.jsonl'], 'w', encoding='utf-8') as jsonl_file:
+            json_file.write('[')
+            for triplet in triplets:
+                # Cap each transition at 3 uses
+                if transition_counts.increment(triplet['transition']) > 3:
+                    continue
+
+                separator = ',' if valid_examples else ''
+                item = json.dumps(triplet_dict(triplet), indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                json_file.write(f"{separator}\n  {item}")
+                if valid_examples:
+                    jsonl_file.write('\n')
+                jsonl_file.write(json.dumps(fewshot_example(triplet), ensure_ascii=False))
+                valid_examples += 1
+            json_file.write('\n]' if valid_examples else ']')
+
+        for transition in transitions:
+            transition_counts_all.increment(transition)
+            unique_transitions.add(transition)
+
+        _write_lines(paths['transitions_only.txt'], unique_transitions)
+        for filename in ('fewshots_rejected.txt', 'fewshots-fineTuning_rejected.txt'):
+            _write_lines(paths[filename], (f"{t}: {count}" for t, count in transition_counts.items() if count > 3))
+        _write_lines(
+            paths['transitions_only_rejected.txt'],
+            (f"{t}: {count}" for t, count in transition_counts_all.items() if count > 1)
+        )
+
+    return valid_examples
+
+def _write_lines(path, lines):
+    """Write lines joined by newlines (no trailing newline), like "\\n".join"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, line in enumerate(lines):
+            if i:
+                f.write('\n')
+            f.write(line)
+
+def stream_outputs_to_zip(triplets, transitions, zip_target, memory_limit=None, extra_files=None):
+    """Stream the six output files into a ZIP archive (a path or a writable binary file object).
+
+    The files are spooled through a temporary directory and copied into the
+    archive in chunks, so no output is ever held in memory as a whole.
+    memory_limit is passed to stream_outputs_to_dir; extra_files ({filename: content})
+    are added as is. Returns the number of valid examples.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        valid_examples = stream_outputs_to_dir(triplets, transitions, tmp_dir, memory_limit)
+        with zipfile.ZipFile(zip_target, 'w') as zip_file:
+            for filename in OUTPUT_FILENAMES:
+                zip_file.write(os.path.join(tmp_dir, filename), filename)
+            for filename, content in (extra_files or {}).items():
+                zip_file.writestr(filename, content)
+    return valid_examples
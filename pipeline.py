@@ -0,0 +1,395 @@
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from document_utils import ParsedDocument, parse_document
+from matcher_utils import TransitionMatcher
+from normalize_utils import NormalizedText, transition_needle
+from sentence_utils import SENTENCE_TERMINATORS, SentenceIndex
+from triplet_utils import Triplet
+from dedup_utils import dedupe_positions, triplet_key
+from metrics_utils import NULL_METRICS, StageMetrics
+from progress_utils import NULL_PROGRESS, ProgressBus
+from segment_utils import TRANSITIONS_MARKER
+
+# Transition lines: article headers to skip, and list decorations to strip
+HEADER_LINE_RE = re.compile(r'^\d+\s+du\s+\d+/\d+')
+LEADING_DECORATION_RE = re.compile(r'^[-•\d\.\s\:]+')
+TRAILING_PUNCTUATION_RE = re.compile(r'[,\s]+$')
+QUE_RE = re.compile(r'\bque\b', re.IGNORECASE)
+QU_APOSTROPHE_RE = re.compile(r"\bqu'", re.IGNORECASE)
+
+# --- Streamlit-free extraction pipeline (safe to run in worker processes) ---
+
+def extract_document(source, filename: str, progress: Optional[ProgressBus] = None,
+                     metrics: Optional[StageMetrics] = None):
+    """Extract triplets and transitions from a .docx path, file-like object or ParsedDocument.
+
+    Raises on unreadable documents; callers decide how to report the error.
+    A ProgressBus receives a 'transitions' event (done, total in the article)
+    per transition; the bus throttles what reaches its sinks.
+    Each Triplet records its article index and the offset of its main
+    paragraph in the document text (see Triplet.span).
+    With a StageMetrics, per-stage timings and counters land in debug_info['metrics'].
+    """
+    metrics = metrics or NULL_METRICS
+    progress = progress or NULL_PROGRESS
+
+    # Read the document, unless the caller already parsed it
+    if isinstance(source, ParsedDocument):
+        document = source
+    else:
+        with metrics.stage('docx_load'):
+            document = parse_document(source, filename)
+    full_text = document.full_text
+    
+    all_triplets = []
+    all_transitions = []
+    
+    # Split text into articles in one pass (marker, body, transitions block)
+    with metrics.stage('marker_scan'):
+        marker_positions, articles = document.segments
+    metrics.count('markers', len(marker_positions))
+    
+    debug_info = {
+        'text_length': len(full_text),
+        'has_marker': len(marker_positions) > 0,
+        'marker_count': len(marker_positions),
+        'found_transitions': [],
+        'articles_processed': 0,
+        'transition_lines_found': 0
+    }
+    
+    if not marker_positions:
+        if metrics.enabled:
+            debug_info['metrics'] = metrics.as_dict()
+        return [], [], filename, debug_info
+    
+    # Process each article section
+    for article_index, article in enumerate(articles):
+        # Extract the main paragraph (between marker and "Transitions:")
+        main_paragraph = article.main_paragraph(full_text)
+        main_offset = article.body_offset(full_text)
+    
+        with metrics.stage('transition_parsing'):
+            # Extract individual transitions using the improved function
+            article_transitions = extract_transitions_from_section(article.transitions_section(full_text))
+        debug_info['found_transitions'].extend(article_transitions)
+    
+        # Normalize the paragraph once and match one needle per transition in one pass
+        with metrics.stage('normalization'):
+            view = NormalizedText(main_paragraph)
+        with metrics.stage('matching'):
+            article_positions = find_transition_positions(main_paragraph, article_transitions, view)
+        metrics.count('matches', sum(len(positions) for positions in article_positions))
+
+        with metrics.stage('context_extraction'):
+            sentence_index = SentenceIndex(main_paragraph)
+    
+            # Process each transition ONLY within this article's main paragraph
+            for done, (transition, transition_positions) in enumerate(
+                    zip(article_transitions, article_positions), 1):
+                # Extract triplets for this transition ONLY from this article's main paragraph
+                for triplet in extract_context_around_transition(
+                        main_paragraph, transition, None, transition_positions, sentence_index):
+                    triplet.article = article_index
+                    triplet.offset = main_offset
+                    all_triplets.append(triplet)
+    
+                # Update progress for user feedback
+                progress.emit('transitions', done, len(article_transitions), filename)
+    
+        all_transitions.extend(article_transitions)
+        debug_info['articles_processed'] += 1
+    
+    debug_info['transition_lines_found'] = len(all_transitions)
+    if metrics.enabled:
+        metrics.count('articles', debug_info['articles_processed'])
+        metrics.count('transitions', len(all_transitions))
+        metrics.count('triplets', len(all_triplets))
+        debug_info['metrics'] = metrics.as_dict()
+    return all_triplets, all_transitions, filename, debug_info
+
+
+def extract_transitions_from_section(transitions_section: str) -> List[str]:
+    """Extract clean transitions from the transitions section at the end of articles"""
+    transitions = []
+    
+    for line in transitions_section.split('\n'):
+        line = line.strip()
+        if line and line != TRANSITIONS_MARKER and not HEADER_LINE_RE.match(line):
+            # Clean up common prefixes/suffixes
+            line = LEADING_DECORATION_RE.sub('', line).strip()
+            # Remove trailing punctuation and spaces
+            line = TRAILING_PUNCTUATION_RE.sub('', line).strip()
+            if len(line) > 2:
+                transitions.append(line)
+    
+    return transitions
+
+def create_transition_variations(transition: str) -> List[str]:
+    """Create variations of a transition to handle different formats and punctuation"""
+    variations = []
+    
+    # Original transition
+    variations.append(transition)
+    
+    # Basic case variations
+    variations.append(transition.lower())
+    variations.append(transition.capitalize())
+    
+    # Handle "que" vs "qu'" - FIXED VERSION
+    if "que" in transition.lower():
+        # Replace "que" at word boundary with "qu'"
+        var_with_apostrophe = QUE_RE.sub("qu'", transition)
+        if var_with_apostrophe != transition:  # Only add if it's different
+            variations.append(var_with_apostrophe)
+            variations.append(var_with_apostrophe.lower())
+            variations.append(var_with_apostrophe.capitalize())
+    
+    # Handle "qu'" vs "que" (reverse case)
+    if "qu'" in transition.lower():
+        var_without_apostrophe = QU_APOSTROPHE_RE.sub("que ", transition)
+        if var_without_apostrophe != transition:
+            variations.append(var_without_apostrophe)
+            variations.append(var_without_apostrophe.lower())
+    
+    # Handle punctuation variations
+    base_transition = transition.rstrip('.,!?;:')
+    if base_transition != transition:
+        variations.append(base_transition)
+        variations.append(base_transition.lower())
+    
+    # Add version with comma at the end
+    if not transition.endswith(','):
+        variations.append(transition + ',')
+        variations.append((transition + ',').lower())
+    
+    # Add version with period at the end
+    if not transition.endswith('.'):
+        variations.append(transition + '.')
+        variations.append((transition + '.').lower())
+    
+    # Remove duplicates while preserving order
+    return list(dict.fromkeys(var for var in variations if var))
+
+
+# --- Corpus-wide needle table ---
+# The same few hundred transitions recur in every article, so their needles
+# are memoized per transition for the life of the process (bounded LRU; each
+# worker process keeps its own table).
+NEEDLE_CACHE_SIZE = 8192
+# An article's matcher is keyed by its whole transition list, so it only
+# hits when articles repeat a list (templated desks reuse a handful of them).
+# Building one costs about 15% of an article's processing, which those hits
+# save; a miss costs a few small automata of memory, hence a small bound.
+MATCHER_CACHE_SIZE = 64
+
+@lru_cache(maxsize=NEEDLE_CACHE_SIZE)
+def get_transition_needle(transition: str) -> Tuple[str, str]:
+    """Memoized transition_needle: (normalized needle, trailing punctuation)"""
+    return transition_needle(transition)
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def article_matcher(transitions: Tuple[str, ...]) -> TransitionMatcher:
+    """Memoized TransitionMatcher over the needles of an article's transitions"""
+    return TransitionMatcher(transitions, [[get_transition_needle(t)[0]] for t in transitions])
+
+def find_transition_positions(main_paragraph: str, transitions: List[str],
+                              view: Optional[NormalizedText] = None) -> List[List[Tuple]]:
+    """Occurrences (start, end, actual_text, transition) of each transition in main_paragraph.
+
+    Matching happens on the normalized view (case, apostrophes, "qu'"/"que",
+    whitespace), so spelling variants need no extra patterns; offsets and
+    actual_text refer to main_paragraph itself.
+    """
+    view = view or NormalizedText(main_paragraph)
+    suffixes = [get_transition_needle(t)[1] for t in transitions]
+    return article_matcher(tuple(transitions)).positions_in_view(view, suffixes)
+
+def load_transitions(path: str) -> List[str]:
+    """Transitions listed one per line, as in a saved transitions_only.txt"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def warm_needle_cache(transitions) -> int:
+    """Precompute the needles of known transitions; returns the table size"""
+    for transition in transitions:
+        get_transition_needle(transition)
+    return get_transition_needle.cache_info().currsize
+
+def extract_context_around_transition(main_paragraph: str, transition: str,
+                                      transition_variations: Optional[List[str]] = None,
+                                      transition_positions: Optional[List[Tuple]] = None,
+                                      sentence_index: Optional[SentenceIndex] = None) -> List[Triplet]:
+    """Extract exactly one sentence before and after each transition occurrence
+
+    transition_positions and sentence_index can be precomputed once for a whole
+    article (find_transition_positions / SentenceIndex); otherwise they are built
+    here. Explicit transition_variations are matched literally instead of the
+    normalized needle.
+    Triplets are compact records over main_paragraph (dict-compatible views).
+    """
+    triplets = []
+    seen = set()
+    
+    # Find all transition positions in the text
+    if transition_positions is None and transition_variations is not None:
+        matcher = TransitionMatcher([transition], [transition_variations])
+        transition_positions = matcher.positions_by_transition(main_paragraph)[0]
+    elif transition_positions is None:
+        transition_positions = find_transition_positions(main_paragraph, [transition])[0]
+    
+    # Remove duplicates and sort by position
+    unique_positions = dedupe_positions(transition_positions)
+    
+    if sentence_index is None:
+        sentence_index = SentenceIndex(main_paragraph)
+    
+    # Process each transition occurrence
+    for trans_start, trans_end, actual_transition, original_transition in unique_positions:
+        # Find exactly one sentence before the transition
+        a_start, a_end = sentence_index.span_before(trans_start)
+        a_period = a_start < a_end and main_paragraph[a_end - 1] not in SENTENCE_TERMINATORS
+        
+        # Find exactly one sentence after the transition
+        b_start, b_end, b_period = sentence_index.span_after(trans_end)
+        
+        triplet = Triplet(main_paragraph, a_start, a_end, a_period, original_transition,
+                          trans_start, trans_end, b_start, b_end, b_period)
+        
+        # Validate minimum content length
+        if triplet.paragraph_a_length < 10 or triplet.paragraph_b_length < 10:
+            continue
+        
+        # Skip duplicate triplets, keeping the first occurrence
+        key = triplet_key(triplet)
+        if key not in seen:
+            seen.add(key)
+            triplets.append(triplet)
+    
+    return triplets
+
+def _extract_document_bytes(filename: str, data: bytes, collect_metrics: bool = False,
+                            keep_document: bool = False):
+    """Worker entry point: isolate per-file failures instead of aborting the batch.
+
+    With keep_document, returns (result, ParsedDocument or None) so the parse
+    can be reused by the caller.
+    """
+    metrics = StageMetrics() if collect_metrics else None
+    document = None
+    try:
+        with (metrics or NULL_METRICS).stage('docx_load'):
+            document = parse_document(data, filename)
+        result = extract_document(document, filename, metrics=metrics)
+    except Exception as e:
+        result = [], [], filename, {'error': str(e)}
+    return (result, document) if keep_document else result
+
+
+def process_documents_parallel(documents: List[Tuple[str, bytes]], max_workers: Optional[int] = None,
+                               progress: Optional[ProgressBus] = None,
+                               cache=None, collect_metrics: bool = False,
+                               warm_transitions: Optional[List[str]] = None, index=None,
+                               parsed_documents: Optional[Dict[int, ParsedDocument]] = None) -> List[Tuple]:
+    """Run extract_document over (filename, bytes) pairs on a process pool.
+
+    Results are returned in input order whatever order the workers finish in.
+    A file that fails (or whose worker dies) yields ([], [], filename, {'error': ...}).
+    When a worker dies, the files the broken pool had not finished are retried
+    one at a time in a fresh pool, so only the file that kills its worker fails.
+    A ProgressBus receives a 'documents' event in the calling process as files
+    complete (cached ones included).
+    With a DocumentCache, unchanged files are served from the cache and only
+    the others are extracted; successful results are stored back.
+    collect_metrics adds per-stage timings to the debug_info of extracted files.
+    warm_transitions (e.g. from load_transitions) preload the needle table
+    of this process and of every worker.
+    With a TransitionIndex, successful results of documents not indexed yet are
+    added to it in input order.
+    With a parsed_documents dict, the ParsedDocument of every file parsed here
+    is stored under its input index, for other extractors (e.g. the GPT path)
+    to reuse; files served from the cache are not parsed.
+    """
+    total = len(documents)
+    progress = progress or NULL_PROGRESS
+    keep_document = parsed_documents is not None
+    results: List[Optional[Tuple]] = [None] * total
+    done = 0
+
+    def failure(i, error):
+        result = [], [], documents[i][0], {'error': str(error)}
+        return (result, None) if keep_document else result
+
+    def finish(i, result):
+        nonlocal done
+        if keep_document:
+            result, document = result
+            if document is not None:
+                parsed_documents[i] = document
+        results[i] = result
+        if cache is not None and 'error' not in result[3]:
+            # Timings describe one run, not the document, so they are not cached
+            debug_info = {key: value for key, value in result[3].items() if key != 'metrics'}
+            cache.put(documents[i][1], result[0], result[1], debug_info)
+        done += 1
+        progress.emit('documents', done, total, documents[i][0])
+
+    pending = []
+    for i, (filename, data) in enumerate(documents):
+        cached = cache.get(data) if cache is not None else None
+        if cached is None:
+            pending.append(i)
+            continue
+        triplets, transitions, debug_info = cached
+        results[i] = triplets, transitions, filename, debug_info
+        done += 1
+        progress.emit('documents', done, total, filename)
+
+    if max_workers == 1 or len(pending) <= 1:
+        if warm_transitions:
+            warm_needle_cache(warm_transitions)
+        for i in pending:
+            finish(i, _extract_document_bytes(*documents[i], collect_metrics, keep_document))
+    else:
+        # Workers are spawned, never forked: callers such as the Streamlit server run
+        # threads, and a forked copy of a threaded process can deadlock on a held lock
+        pool_options = {'mp_context': multiprocessing.get_context('spawn')}
+        if warm_transitions:
+            pool_options.update(initializer=warm_needle_cache, initargs=(tuple(warm_transitions),))
+        # Files caught in a broken pool: any of them may be the one that killed the worker
+        broken = []
+        with ProcessPoolExecutor(max_workers=max_workers, **pool_options) as executor:
+            futures = {}
+            for i in pending:
+                try:
+                    futures[executor.submit(_extract_document_bytes, *documents[i], collect_metrics,
+                                            keep_document)] = i
+                except BrokenProcessPool:
+                    broken.append(i)
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken.append(i)
+                    continue
+                except Exception as e:
+                    result = failure(i, e)
+                finish(i, result)
+        for i in sorted(broken):
+            with ProcessPoolExecutor(max_workers=1, **pool_options) as executor:
+                try:
+                    result = executor.submit(_extract_document_bytes, *documents[i], collect_metrics,
+                                             keep_document).result()
+                except Exception as e:
+                    result = failure(i, e)
+            finish(i, result)
+
+    progress.flush()
+    if index is not None:
+        index.add_results(documents, results)
+    return results
@@ -0,0 +1,103 @@
+import sys
+import time
+from collections import Counter
+from typing import Callable, Iterable, NamedTuple, Optional, TextIO
+
+# Minimum time between two deliveries of the same stage to the sinks
+DEFAULT_INTERVAL = 0.1
+
+
+class ProgressEvent(NamedTuple):
+    stage: str   # 'documents' (files of a batch) or 'transitions' (within an article)
+    done: int
+    total: int
+    label: str = ''
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def final(self) -> bool:
+        return self.done >= self.total
+
+
+ProgressSink = Callable[[ProgressEvent], None]
+
+
+class ProgressBus:
+    """Throttled fan-out of progress events to sinks.
+
+    The pipeline may emit on every item: per stage, sinks receive at most one
+    event every interval seconds, plus every final event (done == total) so
+    bars always complete. counters holds '<stage>.emitted' and
+    '<stage>.delivered' totals.
+    """
+
+    enabled = True
+
+    def __init__(self, sinks: Iterable[ProgressSink] = (), interval: float = DEFAULT_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.clock = clock
+        self.counters = Counter()
+        self._last_delivery = {}
+        self._pending = {}
+
+    def attach(self, sink: ProgressSink) -> ProgressSink:
+        self.sinks.append(sink)
+        return sink
+
+    def emit(self, stage: str, done: int, total: int, label: str = ''):
+        self.counters[stage + '.emitted'] += 1
+        now = self.clock()
+        last = self._last_delivery.get(stage)
+        if done < total and last is not None and now - last < self.interval:
+            # Keep only the latest state; flush() delivers it if nothing follows
+            self._pending[stage] = (done, total, label)
+            return
+        self._pending.pop(stage, None)
+        self._last_delivery[stage] = now
+        self._deliver(ProgressEvent(stage, done, total, label))
+
+    def flush(self):
+        """Deliver the last throttled event of every stage"""
+        pending, self._pending = self._pending, {}
+        for stage, (done, total, label) in pending.items():
+            self._last_delivery[stage] = self.clock()
+            self._deliver(ProgressEvent(stage, done, total, label))
+
+    def _deliver(self, event: ProgressEvent):
+        self.counters[event.stage + '.delivered'] += 1
+        for sink in self.sinks:
+            sink(event)
+
+
+class NullProgress:
+    """Disabled progress: emit is a no-op"""
+
+    enabled = False
+
+    def emit(self, stage: str, done: int, total: int, label: str = ''):
+        pass
+
+    def flush(self):
+        pass
+
+
+NULL_PROGRESS = NullProgress()
+
+
+# --- Sinks ---
+class StreamSink:
+    """Rewrites one status line per event, e.g. on a terminal's stderr"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stderr
+
+    def __call__(self, event: ProgressEvent):
+        line = f"\r{event.stage}: {event.done}/{event.total} {event.label}".rstrip()
+        # Clear what a longer previous line left behind
+        self.stream.write(line + "\x1b[K" + ("\n" if event.final else ""))
+        self.stream.flush()
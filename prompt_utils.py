@@ -0,0 +1,48 @@
+import json
+
+FEWSHOT_TEMPERATURE = 0.5
+
+def build_fewshot_prompt(paragraph: str, transitions: list) -> str:
+    """Render the few-shot extraction prompt for one long paragraph"""
+    return f"""
+Tu es un assistant de rédaction locale. Voici un paragraphe long contenant trois phrases de transition (journalistiques) insérées manuellement : {', '.join(transitions)}.
+
+Ta tâche est de repérer ces trois transitions dans le texte, et de créer trois exemples de type few-shot.
+
+Pour chaque exemple :
+- extrait la partie avant la transition (paragraphe A),
+- note la transition exacte (transition),
+- extrait la partie qui suit (paragraphe B),
+- résume chaque paragraphe A et B en une ou deux phrases claires.
+
+Réponds au format JSON suivant :
+[
+  {{
+    "paragraph_a": "Résumé de la partie A",
+    "transition": "la transition exacte",
+    "paragraph_b": "Résumé de la partie B"
+  }},
+  ...
+]
+Voici le texte :
+
+{paragraph}
+"""
+
+
+def parse_fewshot_output(output: str, strict: bool = False) -> list:
+    """Extract the JSON list of triplets from a raw model completion
+
+    JSON that is not a list gives [], or raises ValueError with strict (so
+    callers can tell it apart from a genuine empty list, e.g. before caching).
+    """
+    start = output.find("[")
+    end = output.rfind("]") + 1
+    json_text = output[start:end]
+    parsed = json.loads(json_text)
+
+    if isinstance(parsed, list):
+        return parsed
+    if strict:
+        raise ValueError(f"expected a JSON list, got {type(parsed).__name__}")
+    return []
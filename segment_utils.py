@@ -0,0 +1,79 @@
+import re
+from typing import List, NamedTuple, Tuple
+
+ARTICLE_MARKER = "À savoir également dans votre département"
+TRANSITIONS_MARKER = "Transitions :"
+
+# One scanner for every token the segmenter needs. The three alternatives
+# cannot overlap each other, so a single finditer pass sees all of them.
+TOKEN_RE = re.compile(
+    '(?P<marker>' + re.escape(ARTICLE_MARKER) + ')'
+    '|(?P<transitions>' + re.escape(TRANSITIONS_MARKER) + ')'
+    r'|(?P<header>\n\s*\d+\s+du\s+\d+/\d+)'
+)
+
+
+class ArticleSpan(NamedTuple):
+    """Offsets of one article in the document text"""
+    marker: int            # start of the article marker
+    body_start: int        # end of the marker
+    body_end: int          # start of "Transitions :"
+    transitions_start: int  # end of "Transitions :"
+    transitions_end: int   # next article header, or end
+    end: int               # next article marker, or end of text
+    has_header: bool       # transitions block ended at an article header
+
+    def main_paragraph(self, text: str) -> str:
+        return text[self.body_start:self.body_end].strip()
+
+    def body_offset(self, text: str) -> int:
+        """Offset of main_paragraph(text) in the document text"""
+        body = text[self.body_start:self.body_end]
+        return self.body_start + len(body) - len(body.lstrip())
+
+    def transitions_section(self, text: str) -> str:
+        section = text[self.transitions_start:self.transitions_end]
+        return section.strip() if self.has_header else section
+
+
+def segment_articles(text: str) -> Tuple[List[int], List[ArticleSpan]]:
+    """Split document text into articles in one regex pass.
+
+    Returns (marker positions, article spans). An article runs from its marker
+    to the next one; markers without a "Transitions :" before the next marker
+    yield no span. The transitions block stops at the first "N du dd/mm"
+    header line after "Transitions :".
+    """
+    markers = []
+    transitions = []
+    headers = []
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'marker':
+            markers.append(match.start())
+        elif kind == 'transitions':
+            transitions.append(match.start())
+        else:
+            headers.append(match.start())
+
+    articles = []
+    t = h = 0
+    for i, marker in enumerate(markers):
+        body_start = marker + len(ARTICLE_MARKER)
+        end = markers[i + 1] if i + 1 < len(markers) else len(text)
+
+        while t < len(transitions) and transitions[t] < body_start:
+            t += 1
+        if t == len(transitions) or transitions[t] > end:
+            continue
+        body_end = transitions[t]
+        transitions_start = body_end + len(TRANSITIONS_MARKER)
+
+        while h < len(headers) and headers[h] < transitions_start:
+            h += 1
+        has_header = h < len(headers) and headers[h] < end
+        articles.append(ArticleSpan(
+            marker, body_start, body_end, transitions_start,
+            headers[h] if has_header else end, end, has_header
+        ))
+    return markers, articles
@@ -0,0 +1,85 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+SENTENCE_END_RE = re.compile(r'[.!?]+(?:\s+|$)')
+PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+ABBREVIATION_RE = re.compile(r'\b(?:M|Mme|Dr|St|etc|vs|cf|p|pp|vol|n°|art)$', re.IGNORECASE)
+SENTENCE_TERMINATORS = ('.', '!', '?')
+
+def find_sentence_boundaries(text: str) -> List[int]:
+    """Find sentence boundaries in text, handling various edge cases"""
+    boundaries = [0]  # Start of text
+
+    for match in SENTENCE_END_RE.finditer(text):
+        # Skip abbreviations such as "M." or "etc." (only a single period can end one)
+        if match.group().rstrip() == '.':
+            before_match = text[max(0, match.start() - 10):match.start()]
+            if ABBREVIATION_RE.search(before_match):
+                continue
+        boundaries.append(match.end())
+
+    # Also add paragraph boundaries as potential sentence boundaries
+    for match in PARAGRAPH_BREAK_RE.finditer(text):
+        boundaries.append(match.end())
+
+    boundaries.append(len(text))  # End of text
+    return sorted(set(boundaries))
+
+
+def strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Bounds of text[start:end].strip() in text"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class SentenceIndex:
+    """Sentence-boundary index of one paragraph, built once and queried with binary search"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.boundaries = find_sentence_boundaries(text)
+
+    def span_before(self, pos: int) -> Tuple[int, int]:
+        """Bounds of sentence_before(pos) in the text"""
+        i = bisect_left(self.boundaries, pos) - 1
+        while i >= 0:
+            start, end = strip_span(self.text, self.boundaries[i], pos)
+            if start < end:
+                return start, end
+            i -= 1
+        return pos, pos
+
+    def sentence_before(self, pos: int) -> str:
+        """Return the text from the last sentence boundary before pos up to pos"""
+        start, end = self.span_before(pos)
+        return self.text[start:end]
+
+    def span_after(self, pos: int) -> Tuple[int, int, bool]:
+        """Bounds of sentence_after(pos) in the text, and whether it gets a '.' appended"""
+        text = self.text
+        while pos < len(text) and (text[pos] == ',' or text[pos].isspace()):
+            pos += 1
+        if pos >= len(text):
+            return pos, pos, False
+
+        start, end = strip_span(text, pos, self.boundaries[bisect_right(self.boundaries, pos)])
+        if start < end and text[end - 1] in SENTENCE_TERMINATORS:
+            return start, end, False
+
+        # No sentence terminator before the next paragraph break / end of text
+        newline = text.find('\n', start, end)
+        first_end = end if newline == -1 else newline
+        if first_end - start > 100:
+            start, end = strip_span(text, start, start + 100)
+            return start, end, True
+        start, end = strip_span(text, start, first_end)
+        return start, end, start < end and text[end - 1] not in SENTENCE_TERMINATORS
+
+    def sentence_after(self, pos: int) -> str:
+        """Return the first sentence starting at pos, skipping leading commas and whitespace"""
+        start, end, add_period = self.span_after(pos)
+        return self.text[start:end] + '.' if add_period else self.text[start:end]
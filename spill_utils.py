@@ -0,0 +1,151 @@
+"""Out-of-core aggregation helpers for the streaming output writers.
+
+SpillingCounter and ExternalSorter keep at most max_bytes of entries in memory
+(estimated from sys.getsizeof) and move the rest to files under a work
+directory. With max_bytes=None they never touch the disk.
+"""
+import heapq
+import os
+import sqlite3
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Rough per-entry cost of the in-memory dict / set slots besides the key itself
+ENTRY_OVERHEAD = 120
+# Maximum number of sorted runs merged at once
+MERGE_FAN_IN = 64
+
+
+class SpillingCounter:
+    """Counter of string keys that spills to SQLite once it outgrows max_bytes.
+
+    items() returns the keys in first-seen order, like collections.Counter.
+    """
+
+    def __init__(self, work_dir: str, max_bytes: Optional[int] = None, name: str = 'counter'):
+        self.work_dir = work_dir
+        self.max_bytes = max_bytes
+        self.name = name
+        self._memory = {}  # key -> [first-seen sequence, count]
+        self._bytes = 0
+        self._next_seq = 0
+        self._conn = None
+
+    def increment(self, key: str) -> int:
+        """Add one to key and return its new count"""
+        entry = self._memory.get(key)
+        if entry is None:
+            row = None
+            if self._conn is not None:
+                row = self._conn.execute("SELECT seq, count FROM counts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                entry = [self._next_seq, 0]
+                self._next_seq += 1
+            else:
+                entry = list(row)
+            self._memory[key] = entry
+            self._bytes += sys.getsizeof(key) + ENTRY_OVERHEAD
+        entry[1] += 1
+        count = entry[1]
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            self._spill()
+        return count
+
+    def _spill(self):
+        if self._conn is None:
+            os.makedirs(self.work_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.work_dir, f"{self.name}.sqlite3"))
+            self._conn.execute("PRAGMA journal_mode = OFF")
+            self._conn.execute("PRAGMA synchronous = OFF")
+            self._conn.execute("CREATE TABLE counts (key TEXT PRIMARY KEY, seq INTEGER NOT NULL, count INTEGER NOT NULL)")
+            self._conn.execute("CREATE INDEX counts_seq ON counts (seq)")
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO counts (key, seq, count) VALUES (?, ?, ?)",
+                ((key, seq, count) for key, (seq, count) in self._memory.items())
+            )
+        self._memory.clear()
+        self._bytes = 0
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """(key, count) pairs in first-seen order"""
+        if self._conn is None:
+            for key, (_, count) in self._memory.items():
+                yield key, count
+            return
+        self._spill()
+        yield from self._conn.execute("SELECT key, count FROM counts ORDER BY seq")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class ExternalSorter:
+    """Sorted, de-duplicated stream of strings, merged from sorted runs on disk when needed.
+
+    Items must not contain newlines (runs are stored one item per line).
+    """
+
+    def __init__(self, work_dir: str, max_bytes: Optional[int] = None, name: str = 'sort'):
+        self.work_dir = work_dir
+        self.max_bytes = max_bytes
+        self.name = name
+        self._buffer = set()
+        self._bytes = 0
+        self._runs: List[str] = []
+        self._run_count = 0
+
+    def add(self, item: str):
+        if item in self._buffer:
+            return
+        self._buffer.add(item)
+        self._bytes += sys.getsizeof(item) + ENTRY_OVERHEAD
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            self._write_run(sorted(self._buffer))
+            self._buffer = set()
+            self._bytes = 0
+
+    def _run_path(self) -> str:
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._run_count += 1
+        return os.path.join(self.work_dir, f"{self.name}-{self._run_count:06d}.txt")
+
+    def _write_run(self, items: Iterable[str]):
+        path = self._run_path()
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            for item in items:
+                f.write(item + '\n')
+        self._runs.append(path)
+
+    @staticmethod
+    def _merge(paths: List[str]) -> Iterator[str]:
+        files = [open(path, encoding='utf-8', newline='\n') for path in paths]
+        try:
+            previous = None
+            for item in heapq.merge(*((line[:-1] for line in f) for f in files)):
+                if item != previous:
+                    yield item
+                    previous = item
+        finally:
+            for f in files:
+                f.close()
+
+    def __iter__(self) -> Iterator[str]:
+        if not self._runs:
+            yield from sorted(self._buffer)
+            return
+        if self._buffer:
+            self._write_run(sorted(self._buffer))
+            self._buffer = set()
+            self._bytes = 0
+        # Merge in rounds so no more than MERGE_FAN_IN files are open at once
+        while len(self._runs) > MERGE_FAN_IN:
+            groups = [self._runs[i:i + MERGE_FAN_IN] for i in range(0, len(self._runs), MERGE_FAN_IN)]
+            self._runs = []
+            for group in groups:
+                self._write_run(self._merge(group))
+                for path in group:
+                    os.remove(path)
+        yield from self._merge(self._runs)
@@ -0,0 +1,153 @@
+"""Synthetic .docx corpus shaped like the regional digests the extractor reads.
+
+Each article has a "N du dd/mm" header, a title, the "À savoir également
+dans votre département" marker, a main paragraph with transitions woven
+between its sentences, and a "Transitions :" block listing them.
+
+    python synthetic_corpus.py OUTPUT_DIR --documents 50 --articles 5
+"""
+import argparse
+import io
+import os
+import random
+import zipfile
+from typing import List
+from xml.sax.saxutils import escape
+
+from segment_utils import ARTICLE_MARKER, TRANSITIONS_MARKER
+
+TRANSITIONS = [
+    "Par ailleurs", "Enfin", "Dans un autre registre", "Autre sujet", "Du côté de la mairie",
+    "Toujours dans la commune", "En parallèle", "Côté sport", "Sur le plan culturel", "Dans le même temps",
+    "Plus au nord", "À quelques kilomètres de là", "Pour terminer", "Ainsi que l'a rappelé le maire",
+    "Dans la foulée", "Au chapitre des travaux", "Changement de décor", "Non loin de là",
+    "Qu'il s'agisse de la voirie", "Côté économie",
+]
+SUBJECTS = [
+    "Le conseil municipal", "La communauté de communes", "Le maire", "L'association des parents d'élèves",
+    "Le club de football", "La préfecture", "M. Dupont", "La médiathèque", "Le comité des fêtes",
+    "Les habitants du quartier", "La direction de l'hôpital", "Le syndicat des eaux",
+]
+VERBS = [
+    "a voté", "a présenté", "prépare", "annonce", "a inauguré", "organise", "a lancé", "finance",
+    "a reporté", "étudie", "a validé", "soutient",
+]
+OBJECTS = [
+    "le budget primitif", "la rénovation de l'école", "un nouveau marché hebdomadaire",
+    "les travaux de la route départementale", "une exposition consacrée au patrimoine local",
+    "le plan de circulation du centre-ville", "la création d'une piste cyclable", "un festival de musique",
+    "la fermeture provisoire de la piscine", "l'extension de la zone d'activités", "un forum de l'emploi",
+    "la réhabilitation de la salle des fêtes",
+]
+COMPLEMENTS = [
+    "pour un montant de 1,2 million d'euros", "avant la fin de l'année", "en présence des élus",
+    "malgré l'opposition d'une partie des riverains", "à la demande des habitants", "dès le mois prochain",
+    "dans le cadre du plan de relance", "après plusieurs mois de concertation", "", "",
+]
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def build_docx(paragraphs: List[str]) -> bytes:
+    """Minimal WordprocessingML package with one w:p per paragraph"""
+    body = ''.join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>' for text in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}<w:sectPr/></w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _RELS)
+        archive.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+def _sentence(rng: random.Random) -> str:
+    parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(COMPLEMENTS)]
+    return ' '.join(part for part in parts if part) + '.'
+
+
+def generate_article_paragraphs(rng: random.Random, number: int, sentences: int, transitions: int) -> List[str]:
+    """Paragraphs of one article: header, title, marker, main paragraph and transitions block"""
+    article_transitions = rng.sample(TRANSITIONS, min(transitions, len(TRANSITIONS)))
+    body = [_sentence(rng) for _ in range(sentences)]
+    # Weave each transition in front of a sentence, after the first one
+    slots = sorted(rng.sample(range(1, sentences), min(len(article_transitions), max(sentences - 1, 0))))
+    for slot, transition in zip(reversed(slots), article_transitions):
+        sentence = body[slot]
+        body[slot] = f"{transition}, {sentence[0].lower()}{sentence[1:]}"
+
+    return [
+        f"{number} du {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+        f"Article {number} : {rng.choice(OBJECTS)}",
+        ARTICLE_MARKER,
+        ' '.join(body),
+        TRANSITIONS_MARKER,
+        *article_transitions,
+    ]
+
+
+def generate_articles(seed: int, articles: int = 5, sentences: int = 30, transitions: int = 6) -> List[List[str]]:
+    """Paragraph lists of every article of one document (deterministic for a seed)"""
+    rng = random.Random(seed)
+    return [generate_article_paragraphs(rng, number, sentences, transitions) for number in range(1, articles + 1)]
+
+
+def generate_document(seed: int, articles: int = 5, sentences: int = 30, transitions: int = 6) -> bytes:
+    return build_docx([p for article in generate_articles(seed, articles, sentences, transitions) for p in article])
+
+
+def document_seed(seed: int, index: int) -> int:
+    return seed * 1_000_003 + index
+
+
+def generate_corpus(output_dir: str, documents: int = 20, articles: int = 5, sentences: int = 30,
+                    transitions: int = 6, seed: int = 0) -> List[str]:
+    """Write `documents` synthetic .docx files into output_dir and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(documents):
+        path = os.path.join(output_dir, f"synthetic_{i:05d}.docx")
+        with open(path, 'wb') as f:
+            f.write(generate_document(document_seed(seed, i), articles, sentences, transitions))
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic .docx corpus")
+    parser.add_argument('output_dir')
+    parser.add_argument('--documents', type=int, default=20)
+    parser.add_argument('--articles', type=int, default=5, help="articles per document")
+    parser.add_argument('--sentences', type=int, default=30, help="sentences per main paragraph")
+    parser.add_argument('--transitions', type=int, default=6, help="transitions per article")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate_corpus(args.output_dir, args.documents, args.articles, args.sentences,
+                            args.transitions, args.seed)
+    print(f"Wrote {len(paths)} documents to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
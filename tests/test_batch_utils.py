@@ -0,0 +1,72 @@
+"""write_batch_requests -> provider -> ingest_batch_results round trip on a results fixture"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_utils import ingest_batch_results, parse_custom_id, write_batch_requests  # noqa: E402
+from document_utils import ParsedDocument  # noqa: E402
+from extract_fewshots import TRANSITION_LIST_MARKER, TRANSITION_MARKER  # noqa: E402
+from prompt_utils import FEWSHOT_TEMPERATURE, build_fewshot_prompt  # noqa: E402
+
+RESULTS_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'batch_results.jsonl')
+TRANSITIONS = ["Enfin", "Par ailleurs", "Dans le même temps"]
+
+
+def long_paragraph(name: str) -> str:
+    return f"{name} " + " ".join(["mot"] * 120)
+
+
+def document(filename: str, paragraph_count: int) -> ParsedDocument:
+    paragraphs = ["Titre", TRANSITION_MARKER]
+    paragraphs += [long_paragraph(f"{filename} {i}") for i in range(paragraph_count)]
+    paragraphs += ["Court paragraphe.", TRANSITION_LIST_MARKER] + TRANSITIONS
+    return ParsedDocument(filename, paragraphs, [])
+
+
+# Not in alphabetical order, to check outputs keep the request order
+DOCUMENTS = [document("b.docx", 3), document("a.docx", 4)]
+
+
+def test_requests_cover_every_long_paragraph(tmp_path):
+    requests_path = tmp_path / 'requests.jsonl'
+
+    count = write_batch_requests(DOCUMENTS, str(requests_path), model="gpt-4")
+
+    requests = [json.loads(line) for line in requests_path.read_text(encoding='utf-8').splitlines()]
+    assert count == len(requests) == 7
+    for request in requests:
+        position, filename, index = parse_custom_id(request['custom_id'])
+        assert DOCUMENTS[position].filename == filename
+        assert request['body'] == {
+            "model": "gpt-4",
+            "messages": [{"role": "user", "content": build_fewshot_prompt(long_paragraph(f"{filename} {index}"),
+                                                                          TRANSITIONS)}],
+            "temperature": FEWSHOT_TEMPERATURE,
+        }
+    # The fixture answers exactly these requests
+    with open(RESULTS_FIXTURE, encoding='utf-8') as f:
+        fixture_ids = {json.loads(line)['custom_id'] for line in f}
+    assert fixture_ids == {request['custom_id'] for request in requests}
+
+
+def test_ingest_restores_request_order_and_reports_failures():
+    outputs, errors = ingest_batch_results(RESULTS_FIXTURE)
+
+    assert list(outputs) == ["b.docx", "a.docx"]
+    b_json, b_jsonl = outputs["b.docx"]
+    assert [example['paragraph_a'] for example in json.loads(b_json)] == ["b0 A", "b1 A"]
+    assert [json.loads(line)['messages'][2]['content'] for line in b_jsonl.splitlines()] == ["Enfin", "Enfin"]
+    assert [example['paragraph_a'] for example in json.loads(outputs["a.docx"][0])] == ["a2 A"]
+
+    failed = sorted(error.split(': ', 1)[0] for error in errors)
+    # HTTP 500, request error, JSON object instead of a list, no JSON at all
+    assert failed == ["0000/b.docx#0002", "0001/a.docx#0000", "0001/a.docx#0001", "0001/a.docx#0003"]
+
+
+def test_ingest_applies_the_limit_per_document():
+    outputs, _ = ingest_batch_results(RESULTS_FIXTURE, limit=1)
+
+    assert [json.loads(fewshot_json)[0]['paragraph_a'] for fewshot_json, _ in outputs.values()] == ["b0 A", "a2 A"]
+    assert all(len(json.loads(fewshot_json)) == 1 for fewshot_json, _ in outputs.values())
@@ -0,0 +1,171 @@
+"""build_fewshots_with_gpt_async against a local OpenAI-compatible stub server"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("openai")
+
+from gpt_async import build_fewshots_concurrently  # noqa: E402
+from cache_utils import PromptCache  # noqa: E402
+from prompt_utils import FEWSHOT_TEMPERATURE, build_fewshot_prompt  # noqa: E402
+
+PARAGRAPH_MARKER = "Voici le texte :"
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers chat completions with the paragraph of the prompt, after scripted failures.
+
+    contents overrides the completion text of given paragraphs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, failures=None, contents=None, delay=0.05):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.failures = {key: list(statuses) for key, statuses in (failures or {}).items()}
+        self.contents = contents or {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []  # (time, paragraph, status)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        paragraph = prompt.split(PARAGRAPH_MARKER, 1)[1].strip()
+        server = self.server
+
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            scripted = server.failures.get(paragraph)
+            status = scripted.pop(0) if scripted else 200
+            server.requests.append((time.monotonic(), paragraph, status))
+        # Later paragraphs answer first, so results arrive out of order
+        time.sleep(server.delay / (1 + len(server.requests) % 3))
+        with server.lock:
+            server.in_flight -= 1
+
+        if status != 200:
+            payload = json.dumps({"error": {"message": f"stub {status}", "type": "stub"}}).encode()
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', '0.3')
+        else:
+            content = server.contents.get(paragraph) or json.dumps(
+                [{"paragraph_a": paragraph, "transition": "Enfin", "paragraph_b": paragraph}]
+            )
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": body['model'],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            }).encode()
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def stub_server(request):
+    server = StubServer(**getattr(request, 'param', {}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def build(server, paragraphs, **kwargs):
+    kwargs.setdefault('max_concurrency', 3)
+    kwargs.setdefault('use_cache', False)
+    return build_fewshots_concurrently(paragraphs, ["Enfin"], model="stub", api_key="test",
+                                       base_url=server.base_url, base_delay=0.01, **kwargs)
+
+
+def test_results_follow_paragraph_order(stub_server):
+    paragraphs = [f"paragraphe {i}" for i in range(12)]
+
+    results = build(stub_server, paragraphs)
+
+    assert [result[0]['paragraph_a'] for result in results] == paragraphs
+
+
+@pytest.mark.parametrize('stub_server', [{'failures': {'p429': [429], 'p500': [500, 503]}}], indirect=True)
+def test_retries_rate_limits_and_server_errors(stub_server):
+    results = build(stub_server, ['p429', 'ok', 'p500'])
+
+    assert [result[0]['paragraph_a'] for result in results] == ['p429', 'ok', 'p500']
+    statuses = {}
+    for _, paragraph, status in stub_server.requests:
+        statuses.setdefault(paragraph, []).append(status)
+    assert statuses == {'p429': [429, 200], 'ok': [200], 'p500': [500, 503, 200]}
+
+
+@pytest.mark.parametrize('stub_server', [{'failures': {'bad': [500, 500, 500]}}], indirect=True)
+def test_gives_up_after_max_retries(stub_server):
+    results = build(stub_server, ['bad', 'good'], max_retries=2)
+
+    assert results[0] == []
+    assert results[1][0]['paragraph_a'] == 'good'
+
+
+def test_concurrency_is_bounded(stub_server):
+    build(stub_server, [f"paragraphe {i}" for i in range(15)], max_concurrency=4)
+
+    assert 1 < stub_server.max_in_flight <= 4
+
+
+@pytest.mark.parametrize('stub_server', [{'failures': {'slow': [429]}}], indirect=True)
+def test_backoff_does_not_hold_a_concurrency_slot(stub_server):
+    build(stub_server, ['slow', 'other'], max_concurrency=1)
+
+    times = {}
+    for when, paragraph, status in stub_server.requests:
+        times.setdefault(paragraph, []).append(when)
+    # 'other' went out while 'slow' waited for its Retry-After
+    assert times['slow'][0] < times['other'][0] < times['slow'][1]
+
+
+@pytest.mark.parametrize('stub_server', [{'contents': {'dict': '{"paragraph_a": "not a list"}'}}], indirect=True)
+def test_only_list_completions_are_cached(stub_server, tmp_path):
+    cache = PromptCache(str(tmp_path / 'prompts.sqlite3'))
+
+    results = build(stub_server, ['dict', 'list'], use_cache=True, cache=cache)
+
+    assert results[0] == []
+    assert cache.get("stub", FEWSHOT_TEMPERATURE, build_fewshot_prompt('dict', ["Enfin"])) is None
+    assert cache.get("stub", FEWSHOT_TEMPERATURE, build_fewshot_prompt('list', ["Enfin"])) is not None
+
+
+class LockedCache:
+    def get(self, *args):
+        return None
+
+    def put(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_cache_failure_keeps_the_completion(stub_server):
+    results = build(stub_server, ['p0', 'p1'], use_cache=True, cache=LockedCache())
+
+    assert [result[0]['paragraph_a'] for result in results] == ['p0', 'p1']
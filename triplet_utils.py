@@ -0,0 +1,146 @@
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Tuple
+
+TRIPLET_FIELDS = ('paragraph_a', 'transition', 'paragraph_b')
+
+# Flags: a '.' is appended to the sentence slice
+_A_PERIOD = 1
+_B_PERIOD = 2
+
+
+class Triplet(Mapping):
+    """Compact (paragraph_a, transition, paragraph_b) record.
+
+    Holds a reference to the article's main paragraph and the offsets of
+    sentence A, the transition occurrence and sentence B; the strings are only
+    built when read. article and offset locate the main paragraph in the
+    document (article index, offset in the document text), -1 and 0 when
+    unknown. Behaves as a read-only dict of the three fields, so
+    ``triplet['paragraph_a']``, ``dict(triplet)`` and comparisons with plain
+    dict triplets keep working.
+    """
+
+    __slots__ = ('text', 'a_start', 'a_end', 'trans_start', 'trans_end', 'b_start', 'b_end', 'flags', 'transition',
+                 'article', 'offset')
+
+    def __init__(self, text: str, a_start: int, a_end: int, a_period: bool, transition: str,
+                 trans_start: int, trans_end: int, b_start: int, b_end: int, b_period: bool,
+                 article: int = -1, offset: int = 0):
+        self.text = text
+        self.a_start = a_start
+        self.a_end = a_end
+        self.trans_start = trans_start
+        self.trans_end = trans_end
+        self.b_start = b_start
+        self.b_end = b_end
+        self.flags = (_A_PERIOD if a_period else 0) | (_B_PERIOD if b_period else 0)
+        self.transition = transition
+        self.article = article
+        self.offset = offset
+
+    @property
+    def paragraph_a(self) -> str:
+        sentence = self.text[self.a_start:self.a_end]
+        return sentence + '.' if self.flags & _A_PERIOD else sentence
+
+    @property
+    def paragraph_b(self) -> str:
+        sentence = self.text[self.b_start:self.b_end]
+        return sentence + '.' if self.flags & _B_PERIOD else sentence
+
+    @property
+    def span(self) -> List[int]:
+        """[article index, start, end] of the transition occurrence in the document text"""
+        return [self.article, self.offset + self.trans_start, self.offset + self.trans_end]
+
+    @property
+    def paragraph_a_length(self) -> int:
+        return self.a_end - self.a_start + (1 if self.flags & _A_PERIOD else 0)
+
+    @property
+    def paragraph_b_length(self) -> int:
+        return self.b_end - self.b_start + (1 if self.flags & _B_PERIOD else 0)
+
+    def __getitem__(self, key: str) -> str:
+        if key == 'paragraph_a':
+            return self.paragraph_a
+        if key == 'transition':
+            return self.transition
+        if key == 'paragraph_b':
+            return self.paragraph_b
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(TRIPLET_FIELDS)
+
+    def __len__(self) -> int:
+        return len(TRIPLET_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Triplet({dict(self)!r})"
+
+    def __reduce__(self):
+        # Pickle offsets, not strings; pickle memoizes the shared article text
+        return _restore_triplet, (self.text,) + self._fields()
+
+    def _fields(self) -> tuple:
+        """Everything but the text, in _restore_triplet order"""
+        return (self.a_start, self.a_end, self.trans_start, self.trans_end, self.b_start, self.b_end,
+                self.flags, self.transition, self.article, self.offset)
+
+
+def _restore_triplet(text, a_start, a_end, trans_start, trans_end, b_start, b_end, flags, transition,
+                     article=-1, offset=0):
+    triplet = Triplet.__new__(Triplet)
+    triplet.text = text
+    triplet.a_start = a_start
+    triplet.a_end = a_end
+    triplet.trans_start = trans_start
+    triplet.trans_end = trans_end
+    triplet.b_start = b_start
+    triplet.b_end = b_end
+    triplet.flags = flags
+    triplet.transition = transition
+    triplet.article = article
+    triplet.offset = offset
+    return triplet
+
+
+def triplet_dict(triplet) -> Dict[str, str]:
+    """Plain dict of a Triplet record (or a copy of a dict triplet), as written to the output files"""
+    return {field: triplet[field] for field in TRIPLET_FIELDS}
+
+
+def triplet_dicts(triplets: Iterable) -> List[Dict[str, str]]:
+    return [triplet_dict(triplet) for triplet in triplets]
+
+
+def triplet_span(triplet) -> List[int]:
+    """[article index, start, end] of a Triplet record's transition; [-1, -1, -1] for a dict triplet"""
+    return triplet.span if isinstance(triplet, Triplet) else [-1, -1, -1]
+
+
+def pack_triplets(triplets: Iterable) -> Tuple[List[str], List[list]]:
+    """JSON-ready (texts, rows) of triplets: each main paragraph once, then one row of offsets per
+    Triplet record ([text index, ...fields]) or the plain dict of any other triplet"""
+    texts = []
+    text_indexes = {}
+    rows = []
+    for triplet in triplets:
+        if not isinstance(triplet, Triplet):
+            rows.append(triplet_dict(triplet))
+            continue
+        index = text_indexes.get(id(triplet.text))
+        if index is None:
+            index = text_indexes[id(triplet.text)] = len(texts)
+            texts.append(triplet.text)
+        rows.append([index, *triplet._fields()])
+    return texts, rows
+
+
+def unpack_triplets(texts: List[str], rows: List) -> List:
+    """Triplets of pack_triplets, as Triplet records sharing their main paragraphs again"""
+    return [
+        _restore_triplet(texts[row[0]], *row[1:]) if isinstance(row, list) else row
+        for row in rows
+    ]
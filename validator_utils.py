@@ -1,54 +1,98 @@
-import openai
-import streamlit as st
-import json
-
-client = openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-def build_fewshots_with_gpt(paragraph: str, transitions: list, model="gpt-4") -> list:
-    prompt = f"""
-Tu es un assistant de rédaction locale. Voici un paragraphe long contenant trois phrases de transition (journalistiques) insérées manuellement : {', '.join(transitions)}.
-
-Ta tâche est de repérer ces trois transitions dans le texte, et de créer trois exemples de type few-shot.
-
-Pour chaque exemple :
-- extrait la partie avant la transition (paragraphe A),
-- note la transition exacte (transition),
-- extrait la partie qui suit (paragraphe B),
-- résume chaque paragraphe A et B en une ou deux phrases claires.
-
-Réponds au format JSON suivant :
-[
-  {{
-    "paragraph_a": "Résumé de la partie A",
-    "transition": "la transition exacte",
-    "paragraph_b": "Résumé de la partie B"
-  }},
-  ...
-]
-Voici le texte :
-
-{paragraph}
-"""
+import logging
+import os
+import sys
+from prompt_utils import FEWSHOT_TEMPERATURE, build_fewshot_prompt, parse_fewshot_output
+from cache_utils import PromptCache, default_prompt_cache
 
+logger = logging.getLogger(__name__)
+
+# The OpenAI client is created on first use, not at import time
+_client = None
+
+def resolve_api_key(api_key: str = None) -> str:
+    """API key from the argument, the OPENAI_API_KEY environment variable or Streamlit secrets"""
+    if api_key:
+        return api_key
+    if os.environ.get("OPENAI_API_KEY"):
+        return os.environ["OPENAI_API_KEY"]
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        try:
+            return st.secrets["OPENAI_API_KEY"]
+        except Exception:
+            pass
+    return None
+
+def get_client(api_key: str = None):
+    """Shared OpenAI client, or a dedicated one when an explicit api_key is given"""
+    global _client
+    import openai
+
+    if api_key:
+        return openai.OpenAI(api_key=api_key)
+    if _client is None:
+        _client = openai.OpenAI(api_key=resolve_api_key())
+    return _client
+
+def __getattr__(name):
+    # Backwards compatible `validator_utils.client`, built lazily
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _show_raw_output(title: str, output: str):
+    """Show the raw completion in the Streamlit app when running inside one, else log it"""
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        st.subheader(title)
+        st.code(output)
+    else:
+        logger.debug("%s\n%s", title, output)
+
+def _show_error(message: str):
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        st.error(message)
+    else:
+        logger.warning(message)
+
+def store_completion(cache: PromptCache, model: str, prompt: str, output: str, parsed: list):
+    """Cache a parsed completion; a cache failure is logged, never lost with the completion"""
     try:
-        response = client.chat.completions.create(
+        cache.put(model, FEWSHOT_TEMPERATURE, prompt, output, parsed)
+    except Exception as e:
+        logger.warning("Could not cache GPT completion: %s", e)
+
+def build_fewshots_with_gpt(paragraph: str, transitions: list, model="gpt-4", use_cache=True,
+                            cache: PromptCache = None, api_key: str = None) -> list:
+    prompt = build_fewshot_prompt(paragraph, transitions)
+
+    # Identical prompts are answered from the local prompt cache unless bypassed
+    if use_cache:
+        cache = cache or default_prompt_cache()
+        cached = cache.get(model, FEWSHOT_TEMPERATURE, prompt)
+        if cached is not None:
+            output, parsed = cached
+            _show_raw_output("🧠 GPT Raw Output (cached)", output)
+            return parsed
+
+    try:
+        response = get_client(api_key).chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
+            temperature=FEWSHOT_TEMPERATURE,
         )
         output = response.choices[0].message.content.strip()
 
         # Show raw output in Streamlit
-        st.subheader("🧠 GPT Raw Output")
-        st.code(output)
+        _show_raw_output("🧠 GPT Raw Output", output)
 
         # Attempt to extract JSON from output
-        start = output.find("[")
-        end = output.rfind("]") + 1
-        json_text = output[start:end]
-        parsed = json.loads(json_text)
-
-        return parsed if isinstance(parsed, list) else []
+        parsed = parse_fewshot_output(output, strict=True)
     except Exception as e:
-        st.error(f"GPT few-shot builder failed: {e}")
+        _show_error(f"GPT few-shot builder failed: {e}")
         return []
+
+    if use_cache:
+        store_completion(cache, model, prompt, output, parsed)
+    return parsed